@@ -0,0 +1,1136 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import clone
+import helpers
+
+
+# Размеры каталога: количество таблиц и количество столбцов в одной таблице (2000 - лимит SQLITE_MAX_COLUMN)
+CATALOG_TABLE_COUNTS = (10, 1000, 10000, 50000)
+CATALOG_COLUMN_COUNTS = (10, 100, 1000, 2000)
+CATALOG_LOOKUPS = 1000
+# Размеры кэша подготовленных операторов для сравнения поиска по каталогу
+STATEMENT_CACHE_SIZES = (0, 128)
+
+# Количество строк для массовой вставки и размер пачки executemany
+BULK_ROW_COUNTS = (100_000, 1_000_000, 10_000_000)
+BULK_BATCH_SIZE = 10_000
+
+# Поиск по indexed_table: количество строк, поисков с индексом и без него (без индекса каждый поиск - полный проход)
+INDEX_ROW_COUNTS = (100_000, 1_000_000, 5_000_000)
+INDEX_LOOKUPS = 1000
+INDEX_SCAN_LOOKUPS = 20
+# Ширина диапазона в поиске BETWEEN, в единицах значения column_to_index
+INDEX_RANGE_WIDTH = 1000
+
+# Дочерние строки в employees и books и количество удалений и изменений ключей родителей
+FOREIGN_KEY_ROW_COUNTS = (100_000, 1_000_000)
+FOREIGN_KEY_PARENT_OPERATIONS = 200
+
+# Копирование таблицы: CREATE TABLE ... AS SELECT, CREATE TABLE + INSERT ... SELECT и executemany из Python
+CTAS_ROW_COUNTS = (1_000_000, 5_000_000)
+CTAS_METHODS = ('ctas', 'create_insert_select', 'executemany')
+
+# Таблица с составным ключом в вариантах rowid, WITHOUT ROWID и STRICT
+VARIANT_ROW_COUNTS = (1_000_000, 5_000_000)
+VARIANT_LOOKUPS = 10_000
+# Курсов на студента: строки одного студента образуют диапазон ключа
+VARIANT_COURSES = 20
+
+# Массовая вставка в таблицы с AUTOINCREMENT и с обычным INTEGER PRIMARY KEY
+AUTOINCREMENT_ROW_COUNTS = (1_000_000, 5_000_000)
+# Вставки с фиксацией каждой строки: каждая запись в sqlite_sequence - ещё одна изменённая страница
+AUTOINCREMENT_COMMITTED_ROWS = 2000
+
+# Профилирование CHECK: число ограничений, сложность выражения и строки для подсчёта шагов VM
+CHECK_COUNTS = (0, 1, 4, 16, 64)
+CHECK_COMPLEXITIES = ('comparison', 'expression', 'function')
+CHECK_ROW_COUNT = 200_000
+CHECK_STEP_ROWS = 1000
+# Столбцы, на которые ссылаются ограничения по кругу
+CHECK_VALUE_COLUMNS = 8
+
+# Построение уникального индекса: UNIQUE в определении столбца против загрузки и CREATE UNIQUE INDEX
+UNIQUE_BUILD_ROW_COUNTS = (100_000, 1_000_000, 5_000_000)
+
+# Полная копия таблицы clone.py против CTAS и копии всей базы через Connection.backup()
+CLONE_ROW_COUNTS = (1_000_000, 5_000_000)
+CLONE_METHODS = ('clone', 'ctas', 'backup')
+
+# Гонка DDL на одной базе в режиме WAL: число писателей, timeout соединения в секундах,
+# потоки или процессы и количество собственных таблиц у каждого писателя
+DDL_WRITER_COUNTS = (1, 2, 4, 8, 16)
+DDL_TIMEOUTS = (0, 0.05, 5.0)
+DDL_MODES = ('threads', 'processes')
+DDL_TABLES_PER_WRITER = 50
+# Пауза перед повтором после SQLITE_BUSY; при timeout = 0 без неё писатели крутились бы в цикле
+DDL_RETRY_DELAY = 0.001
+# Таблица, которую все писатели создают одновременно: создать её должен ровно один
+DDL_CONTENDED_TABLE_SQL = 'CREATE TABLE employees (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL, age INTEGER);'
+
+# Проверка скопированной таблицы: передача строк в Python против отпечатков внутри SQLite
+CHECKSUM_ROW_COUNTS = (1_000_000,)
+
+# Таблицы из негативных тестов на ограничения: DDL с ограничением, DDL без него,
+# генератор строк и строка, которая должна нарушить ограничение после загрузки
+CONSTRAINT_CASES = {
+    'unique': {
+        'enforced_sql': 'CREATE TABLE test_unique (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);',
+        'relaxed_sql': 'CREATE TABLE test_unique (id INTEGER PRIMARY KEY, name TEXT NOT NULL);',
+        'insert_sql': 'INSERT INTO test_unique (id, name) VALUES (?, ?);',
+        'row': lambda position: (position, f'user{position}'),
+        'violating_row': lambda row_count: (row_count + 1, 'user1'),
+    },
+    'primary_key': {
+        'enforced_sql': 'CREATE TABLE test_unique (id INTEGER PRIMARY KEY, name TEXT NOT NULL);',
+        'relaxed_sql': 'CREATE TABLE test_unique (id INTEGER, name TEXT NOT NULL);',
+        'insert_sql': 'INSERT INTO test_unique (id, name) VALUES (?, ?);',
+        'row': lambda position: (position, f'user{position}'),
+        'violating_row': lambda row_count: (1, 'user2'),
+    },
+    'not_null': {
+        'enforced_sql': 'CREATE TABLE test_not_null (id INTEGER PRIMARY KEY, name TEXT NOT NULL);',
+        'relaxed_sql': 'CREATE TABLE test_not_null (id INTEGER PRIMARY KEY, name TEXT);',
+        'insert_sql': 'INSERT INTO test_not_null (id, name) VALUES (?, ?);',
+        'row': lambda position: (position, f'user{position}'),
+        'violating_row': lambda row_count: (row_count + 1, None),
+    },
+    'check': {
+        'enforced_sql': 'CREATE TABLE products (id INTEGER PRIMARY KEY, price REAL CHECK(price > 0));',
+        'relaxed_sql': 'CREATE TABLE products (id INTEGER PRIMARY KEY, price REAL);',
+        'insert_sql': 'INSERT INTO products (id, price) VALUES (?, ?);',
+        'row': lambda position: (position, position * 0.5 + 1),
+        'violating_row': lambda row_count: (row_count + 1, -1.0),
+    },
+}
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    value = function(*args, **kwargs)
+    return time.perf_counter() - started, value
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else None
+
+
+def temporary_database(directory, name):
+    path = os.path.join(directory, name)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path
+
+
+def catalog_table_sql(table_name):
+    return f"""
+    CREATE TABLE {table_name} (
+        id INTEGER PRIMARY KEY,
+        name VARCHAR(80),
+        location POINT
+    );
+    """
+
+
+def wide_table_sql(table_name, column_count):
+    columns = ',\n'.join(f'    column_{position} INTEGER' for position in range(column_count))
+    return f'CREATE TABLE {table_name} (\n{columns}\n);'
+
+
+def bench_catalog(table_counts=CATALOG_TABLE_COUNTS, column_counts=CATALOG_COLUMN_COUNTS,
+                  lookups=CATALOG_LOOKUPS, seed=0):
+    # CREATE TABLE, поиск по sqlite_master и PRAGMA table_info при растущем каталоге.
+    # Каталог хранится в файле, чтобы учесть разбор схемы при открытии соединения
+    random_generator = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for table_count in table_counts:
+            path = temporary_database(directory, 'catalog.db')
+            conn = sqlite3.connect(path)
+            table_names = [f'table_{position}' for position in range(table_count)]
+
+            def create_tables():
+                # DDL вне явной транзакции фиксируется по одной таблице, поэтому весь каталог создаётся в одной
+                conn.execute('BEGIN;')
+                for table_name in table_names:
+                    conn.execute(catalog_table_sql(table_name))
+                conn.commit()
+
+            create_seconds, _ = timed(create_tables)
+            conn.close()
+
+            # Разбор схемы происходит при первом обращении к каталогу после открытия соединения
+            def open_and_parse_schema():
+                opened = sqlite3.connect(path)
+                opened.execute("SELECT count(*) FROM sqlite_master;").fetchone()
+                return opened
+
+            open_seconds, conn = timed(open_and_parse_schema)
+            sample = [random_generator.choice(table_names) for _ in range(lookups)]
+
+            def lookup_tables():
+                cursor = conn.cursor()
+                for table_name in sample:
+                    cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
+                    assert cursor.fetchone() is not None
+
+            def read_table_info():
+                cursor = conn.cursor()
+                for table_name in sample:
+                    cursor.execute(f"PRAGMA table_info({table_name});")
+                    assert len(cursor.fetchall()) == 3
+
+            lookup_seconds, _ = timed(lookup_tables)
+            table_info_seconds, _ = timed(read_table_info)
+            conn.close()
+            results.append({
+                'case': 'tables',
+                'table_count': table_count,
+                'create_seconds': create_seconds,
+                'create_tables_per_second': rate(table_count, create_seconds),
+                'open_and_parse_schema_seconds': open_seconds,
+                'lookups': lookups,
+                'sqlite_master_lookup_seconds': lookup_seconds,
+                'sqlite_master_lookups_per_second': rate(lookups, lookup_seconds),
+                'table_info_seconds': table_info_seconds,
+                'table_info_per_second': rate(lookups, table_info_seconds),
+            })
+
+        for column_count in column_counts:
+            conn = sqlite3.connect(':memory:')
+            create_seconds, _ = timed(conn.execute, wide_table_sql('wide_table', column_count))
+            table_info_seconds, columns = timed(lambda: conn.execute("PRAGMA table_info(wide_table);").fetchall())
+            assert len(columns) == column_count
+            conn.close()
+            results.append({
+                'case': 'columns',
+                'column_count': column_count,
+                'create_seconds': create_seconds,
+                'table_info_seconds': table_info_seconds,
+            })
+    return results
+
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        yield batch
+
+
+def bulk_load(conn, insert_sql, rows, batch_size):
+    # Загрузка строк из генератора пачками executemany в одной транзакции
+    conn.execute('BEGIN;')
+    for batch in batches(rows, batch_size):
+        conn.executemany(insert_sql, batch)
+    conn.commit()
+
+
+def bench_constraints(row_counts=BULK_ROW_COUNTS, constraints=tuple(CONSTRAINT_CASES), batch_size=BULK_BATCH_SIZE):
+    # Скорость массовой вставки с ограничением и без него; в конце строка-нарушитель должна дать IntegrityError.
+    # База во временном файле без журнала, чтобы 10M строк не занимали память и не упирались в fsync
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for constraint, row_count in itertools.product(constraints, row_counts):
+            case = CONSTRAINT_CASES[constraint]
+            for enforced in (True, False):
+                conn = sqlite3.connect(temporary_database(directory, 'constraints.db'))
+                conn.execute('PRAGMA journal_mode = OFF;')
+                conn.execute('PRAGMA synchronous = OFF;')
+                conn.execute(case['enforced_sql'] if enforced else case['relaxed_sql'])
+                rows = (case['row'](position) for position in range(1, row_count + 1))
+                seconds, _ = timed(bulk_load, conn, case['insert_sql'], rows, batch_size)
+
+                violation_raised = False
+                try:
+                    conn.execute(case['insert_sql'], case['violating_row'](row_count))
+                except sqlite3.IntegrityError:
+                    violation_raised = True
+                conn.close()
+                if violation_raised != enforced:
+                    raise AssertionError(
+                        f'{constraint}: IntegrityError {"не " if enforced else ""}возникла '
+                        f'при {"наличии" if enforced else "отсутствии"} ограничения'
+                    )
+                results.append({
+                    'constraint': constraint,
+                    'enforced': enforced,
+                    'rows': row_count,
+                    'seconds': seconds,
+                    'rows_per_second': rate(row_count, seconds),
+                    'violation_raised': violation_raised,
+                })
+    return results
+
+
+def indexed_value(number):
+    return f'value_{number:010d}'
+
+
+def timed_lookups(conn, sql, parameter_sets):
+    def run():
+        rows = 0
+        for parameters in parameter_sets:
+            rows += len(conn.execute(sql, parameters).fetchall())
+        return rows
+
+    seconds, rows = timed(run)
+    return {
+        'lookups': len(parameter_sets),
+        'rows': rows,
+        'seconds': seconds,
+        'lookups_per_second': rate(len(parameter_sets), seconds),
+    }
+
+
+def bench_index_lookups(row_counts=INDEX_ROW_COUNTS, lookups=INDEX_LOOKUPS, scan_lookups=INDEX_SCAN_LOOKUPS,
+                        range_width=INDEX_RANGE_WIDTH, seed=0):
+    # Поиск по равенству и диапазону по column_to_index без индекса и с каждым вариантом индекса.
+    # Перед замером EXPLAIN QUERY PLAN должен показать, что индекс используется
+    random_generator = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            conn = sqlite3.connect(temporary_database(directory, 'indexed.db'))
+            conn.execute('PRAGMA journal_mode = OFF;')
+            conn.execute('PRAGMA synchronous = OFF;')
+            conn.execute(helpers.INDEXED_TABLE_SQL)
+            key_space = row_count * 10
+            rows = (
+                (indexed_value(random_generator.randrange(key_space)), f'payload_{position}')
+                for position in range(row_count)
+            )
+            load_seconds, _ = timed(
+                bulk_load, conn, 'INSERT INTO indexed_table (column_to_index, payload) VALUES (?, ?);',
+                rows, BULK_BATCH_SIZE,
+            )
+
+            starts = [random_generator.randrange(key_space) for _ in range(lookups)]
+            equality_parameters = [(indexed_value(start),) for start in starts]
+            range_parameters = [(indexed_value(start), indexed_value(start + range_width)) for start in starts]
+            plain = helpers.INDEX_VARIANTS['plain']
+            results.append({
+                'rows': row_count,
+                'variant': 'none',
+                'load_seconds': load_seconds,
+                'equality': timed_lookups(conn, plain['equality_sql'], equality_parameters[:scan_lookups]),
+                'range': timed_lookups(conn, plain['range_sql'], range_parameters[:scan_lookups]),
+            })
+
+            for name, variant in helpers.INDEX_VARIANTS.items():
+                index_seconds, _ = timed(conn.execute, variant['index_sql'])
+                for sql, parameters in ((variant['equality_sql'], equality_parameters[0]),
+                                        (variant['range_sql'], range_parameters[0])):
+                    plan = helpers.query_plan(conn, sql, parameters)
+                    if not helpers.uses_index(plan, variant['index_name']):
+                        raise AssertionError(f"{name}: запрос не использует {variant['index_name']}: {plan}")
+                results.append({
+                    'rows': row_count,
+                    'variant': name,
+                    'index_seconds': index_seconds,
+                    'equality': timed_lookups(conn, variant['equality_sql'], equality_parameters),
+                    'range': timed_lookups(conn, variant['range_sql'], range_parameters),
+                })
+                conn.execute(f"DROP INDEX {variant['index_name']};")
+            conn.close()
+    return results
+
+
+def bench_foreign_keys(row_counts=FOREIGN_KEY_ROW_COUNTS, parent_operations=FOREIGN_KEY_PARENT_OPERATIONS, seed=0):
+    # Удаление и изменение ключей родителей при PRAGMA foreign_keys = ON с индексами по дочерним
+    # столбцам и без них. Дочерние строки ссылаются только на первую половину родителей,
+    # операции выполняются над второй, поэтому они проходят проверку, но требуют поиска в дочерней таблице
+    random_generator = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count, child_indexes in itertools.product(row_counts, (False, True)):
+            parent_count = max(row_count // 100, parent_operations * 2)
+            referenced = parent_count // 2
+            conn = sqlite3.connect(temporary_database(directory, 'foreign_keys.db'))
+            conn.execute('PRAGMA journal_mode = OFF;')
+            conn.execute('PRAGMA synchronous = OFF;')
+            conn.execute('PRAGMA foreign_keys = ON;')
+            conn.executescript(helpers.FOREIGN_KEY_SCHEMA_SQL)
+            if child_indexes:
+                conn.executescript(helpers.CHILD_INDEXES_SQL)
+
+            parents = [(position,) for position in range(1, parent_count + 1)]
+            conn.execute('BEGIN;')
+            conn.executemany('INSERT INTO cities (id) VALUES (?);', parents)
+            conn.executemany('INSERT INTO authors (author_id) VALUES (?);', parents)
+            conn.executemany('INSERT INTO publishers (publisher_id) VALUES (?);', parents)
+            conn.commit()
+            employees = (
+                (position, f'employee_{position}', 30, random_generator.randint(1, referenced))
+                for position in range(1, row_count + 1)
+            )
+            books = (
+                (position, random_generator.randint(1, referenced), random_generator.randint(1, referenced))
+                for position in range(1, row_count + 1)
+            )
+            load_seconds, _ = timed(
+                bulk_load, conn, 'INSERT INTO employees (id, name, age, city_id) VALUES (?, ?, ?, ?);',
+                employees, BULK_BATCH_SIZE,
+            )
+            books_seconds, _ = timed(
+                bulk_load, conn, 'INSERT INTO books (book_id, author_id, publisher_id) VALUES (?, ?, ?);',
+                books, BULK_BATCH_SIZE,
+            )
+
+            targets = [(key,) for key in range(parent_count, parent_count - parent_operations, -1)]
+
+            def run_parent_operation(sql, parameters):
+                conn.execute('BEGIN;')
+                conn.executemany(sql, parameters)
+                conn.commit()
+
+            delete_cities_seconds, _ = timed(run_parent_operation, 'DELETE FROM cities WHERE id = ?;', targets)
+            update_authors_seconds, _ = timed(
+                run_parent_operation, 'UPDATE authors SET author_id = -author_id WHERE author_id = ?;', targets)
+            delete_publishers_seconds, _ = timed(
+                run_parent_operation, 'DELETE FROM publishers WHERE publisher_id = ?;', targets)
+
+            # Удаление родителя, на которого есть ссылки, должно быть отклонено
+            try:
+                conn.execute('DELETE FROM cities WHERE id = 1;')
+            except sqlite3.IntegrityError:
+                pass
+            else:
+                raise AssertionError('Удаление города с сотрудниками не вызвало IntegrityError')
+            unindexed = len(helpers.unindexed_foreign_keys(conn))
+            conn.close()
+            results.append({
+                'rows': row_count,
+                'parents': parent_count,
+                'child_indexes': child_indexes,
+                'unindexed_foreign_keys': unindexed,
+                'load_employees_seconds': load_seconds,
+                'load_books_seconds': books_seconds,
+                'operations': parent_operations,
+                'delete_cities_per_second': rate(parent_operations, delete_cities_seconds),
+                'update_authors_per_second': rate(parent_operations, update_authors_seconds),
+                'delete_publishers_per_second': rate(parent_operations, delete_publishers_seconds),
+            })
+    return results
+
+
+def copy_table(conn, method, batch_size):
+    # Копия source_cities в copied_cities. Для CREATE TABLE + INSERT и executemany копия создаётся по DDL
+    # исходной таблицы и сохраняет ограничения, CTAS их теряет
+    if method == 'ctas':
+        conn.execute('CREATE TABLE copied_cities AS SELECT * FROM source_cities;')
+        return
+    source_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'source_cities';").fetchone()[0]
+    conn.execute('BEGIN;')
+    conn.execute(source_sql.replace('source_cities', 'copied_cities', 1))
+    if method == 'create_insert_select':
+        conn.execute('INSERT INTO copied_cities SELECT * FROM source_cities;')
+    else:
+        source = conn.execute('SELECT * FROM source_cities;')
+        placeholders = ', '.join('?' * len(source.description))
+        while rows := source.fetchmany(batch_size):
+            conn.executemany(f'INSERT INTO copied_cities VALUES ({placeholders});', rows)
+    conn.commit()
+
+
+def bench_ctas(row_counts=CTAS_ROW_COUNTS, methods=CTAS_METHODS, batch_size=BULK_BATCH_SIZE):
+    # Скорость копирования и проверка копии потоковым сравнением строк через fetchmany
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            conn = sqlite3.connect(temporary_database(directory, 'ctas.db'))
+            conn.execute('PRAGMA journal_mode = OFF;')
+            conn.execute('PRAGMA synchronous = OFF;')
+            conn.executescript(helpers.CTAS_SOURCE_SQL)
+            conn.execute(helpers.CTAS_FILL_SQL, (row_count,))
+            conn.commit()
+            for method in methods:
+                seconds, _ = timed(copy_table, conn, method, batch_size)
+
+                def verify():
+                    source = conn.execute('SELECT * FROM source_cities ORDER BY id;')
+                    copied = conn.execute('SELECT * FROM copied_cities ORDER BY rowid;')
+                    return helpers.first_difference(
+                        helpers.iter_fetchmany(source, batch_size), helpers.iter_fetchmany(copied, batch_size))
+
+                verify_seconds, difference = timed(verify)
+                if difference is not None:
+                    raise AssertionError(f'{method}: строка {difference[0]} копии отличается: {difference[1:]}')
+                primary_key = [row[1] for row in conn.execute('PRAGMA table_info(copied_cities);') if row[5]]
+                conn.execute('DROP TABLE copied_cities;')
+                results.append({
+                    'method': method,
+                    'rows': row_count,
+                    'seconds': seconds,
+                    'rows_per_second': rate(row_count, seconds),
+                    'verify_seconds': verify_seconds,
+                    'primary_key': primary_key,
+                })
+            conn.close()
+    return results
+
+
+def bench_checksums(row_counts=CHECKSUM_ROW_COUNTS, batch_size=BULK_BATCH_SIZE):
+    columns = ('id', 'name', 'population', 'code', 'location', 'country_id')
+    numeric_columns = ('id', 'population', 'location')
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            conn = sqlite3.connect(temporary_database(directory, 'checksums.db'))
+            conn.execute('PRAGMA journal_mode = OFF;')
+            conn.executescript(helpers.CTAS_SOURCE_SQL)
+            conn.execute(helpers.CTAS_FILL_SQL, (row_count,))
+            conn.execute('CREATE TABLE copied_cities AS SELECT * FROM source_cities;')
+            conn.commit()
+
+            def stream_rows():
+                cursor = conn.execute('SELECT * FROM copied_cities ORDER BY rowid;')
+                return helpers.first_difference(helpers.iter_fetchmany(cursor, batch_size), helpers.ctas_source_rows(row_count))
+
+            def count_and_totals():
+                return conn.execute(
+                    'SELECT count(*), total(id), total(population), total(location) FROM copied_cities;').fetchone()
+
+            stream_seconds, difference = timed(stream_rows)
+            totals_seconds, _ = timed(count_and_totals)
+            fingerprint_seconds, actual = timed(helpers.table_fingerprint, conn, 'copied_cities', numeric_columns)
+            expected_seconds, expected = timed(
+                helpers.expected_fingerprint, helpers.ctas_source_rows(row_count), columns, numeric_columns)
+            conn.close()
+            if difference is not None or actual != expected:
+                raise AssertionError(f'Копия из {row_count} строк не совпала с ожидаемыми строками')
+            results.append({
+                'rows': row_count,
+                'stream_rows_seconds': stream_seconds,
+                'count_and_totals_seconds': totals_seconds,
+                'table_fingerprint_seconds': fingerprint_seconds,
+                'expected_fingerprint_seconds': expected_seconds,
+            })
+    return results
+
+
+def bench_table_variants(row_counts=VARIANT_ROW_COUNTS, lookups=VARIANT_LOOKUPS, seed=0):
+    # Загрузка, размер файла и поиск по составному ключу для каждого варианта таблицы.
+    # Строки вставляются в перемешанном порядке ключей: n * 7919 по модулю числа строк - перестановка
+    random_generator = random.Random(seed)
+    fill_sql = f"""
+    WITH RECURSIVE numbers(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM numbers WHERE n < ? - 1)
+    INSERT INTO enrollments (student_id, course_id, grade, note)
+    SELECT k / {VARIANT_COURSES}, k % {VARIANT_COURSES}, k % 5 + 1, 'note_' || k
+    FROM (SELECT n * 7919 % ? AS k FROM numbers);
+    """
+    point_sql = 'SELECT grade FROM enrollments WHERE student_id = ? AND course_id = ?;'
+    range_sql = 'SELECT course_id, grade FROM enrollments WHERE student_id = ?;'
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            if row_count % 7919 == 0:
+                raise ValueError('Число строк не должно делиться на 7919')
+            students = row_count // VARIANT_COURSES
+            points = [(random_generator.randrange(students), random_generator.randrange(VARIANT_COURSES))
+                      for _ in range(lookups)]
+            ranges = [(random_generator.randrange(students),) for _ in range(lookups)]
+            for variant in helpers.TABLE_VARIANTS:
+                path = temporary_database(directory, 'variants.db')
+                conn = sqlite3.connect(path)
+                conn.execute('PRAGMA journal_mode = OFF;')
+                conn.execute('PRAGMA synchronous = OFF;')
+                conn.execute(helpers.table_variant_sql(helpers.COMPOSITE_KEY_TABLE_SQL, variant))
+
+                def load():
+                    conn.execute(fill_sql, (row_count, row_count))
+                    conn.commit()
+
+                load_seconds, _ = timed(load)
+                page_count = conn.execute('PRAGMA page_count;').fetchone()[0]
+                page_size = conn.execute('PRAGMA page_size;').fetchone()[0]
+                # Оба поиска должны идти по ключу: в rowid-таблице через sqlite_autoindex, в WITHOUT ROWID - по самой таблице
+                for sql, parameters in ((point_sql, points[0]), (range_sql, ranges[0])):
+                    plan = helpers.query_plan(conn, sql, parameters)
+                    if not all(detail.startswith('SEARCH') for detail in plan):
+                        raise AssertionError(f'{variant}: поиск по ключу сканирует таблицу: {plan}')
+                point = timed_lookups(conn, point_sql, points)
+                range_ = timed_lookups(conn, range_sql, ranges)
+                conn.close()
+                if point['rows'] != lookups or range_['rows'] != lookups * VARIANT_COURSES:
+                    raise AssertionError(f"{variant}: найдено {point['rows']} и {range_['rows']} строк")
+                results.append({
+                    'variant': variant,
+                    'rows': row_count,
+                    'load_seconds': load_seconds,
+                    'rows_per_second': rate(row_count, load_seconds),
+                    'page_count': page_count,
+                    'database_bytes': page_count * page_size,
+                    'file_bytes': os.path.getsize(path),
+                    'point_lookups_per_second': point['lookups_per_second'],
+                    'range_lookups_per_second': range_['lookups_per_second'],
+                })
+    return results
+
+
+def bench_autoincrement(row_counts=AUTOINCREMENT_ROW_COUNTS, committed_rows=AUTOINCREMENT_COMMITTED_ROWS,
+                        batch_size=BULK_BATCH_SIZE):
+    # executemany и INSERT ... SELECT в одной транзакции, затем вставки по одной строке с COMMIT
+    # в файле с журналом. После загрузки проверяется sqlite_sequence и непрерывность id
+    insert_sql = 'INSERT INTO products (price) VALUES (?);'
+    select_sql = """
+    WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < ?)
+    INSERT INTO products (price) SELECT n * 0.5 FROM numbers;
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [(method, row_count) for row_count in row_counts for method in ('executemany', 'insert_select')]
+        cases.append(('commit_per_row', committed_rows))
+        for (method, row_count), variant in itertools.product(cases, helpers.PRIMARY_KEY_VARIANTS):
+            conn = sqlite3.connect(temporary_database(directory, 'autoincrement.db'), isolation_level=None)
+            if method != 'commit_per_row':
+                conn.execute('PRAGMA journal_mode = OFF;')
+                conn.execute('PRAGMA synchronous = OFF;')
+            conn.execute(helpers.PRIMARY_KEY_VARIANTS[variant])
+
+            def load():
+                if method == 'executemany':
+                    bulk_load(conn, insert_sql, ((position * 0.5,) for position in range(1, row_count + 1)), batch_size)
+                elif method == 'insert_select':
+                    conn.execute(select_sql, (row_count,))
+                else:
+                    for position in range(1, row_count + 1):
+                        conn.execute(insert_sql, (position * 0.5,))
+
+            seconds, _ = timed(load)
+            count, max_id = conn.execute('SELECT count(*), max(id) FROM products;').fetchone()
+            sequence = None
+            if variant == 'autoincrement':
+                sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'products';").fetchone()[0]
+            conn.close()
+            if count != row_count or max_id != row_count or sequence not in (None, row_count):
+                raise AssertionError(f'{variant}, {method}: {count} строк, max(id) = {max_id}, seq = {sequence}')
+            results.append({
+                'variant': variant,
+                'method': method,
+                'rows': row_count,
+                'seconds': seconds,
+                'rows_per_second': rate(row_count, seconds),
+                'sqlite_sequence': sequence,
+            })
+    return results
+
+
+def check_value_is_valid(value):
+    # Пользовательская функция для CHECK, регистрируется через create_function
+    return value is not None and 0 <= value < 1_000_000
+
+
+def check_constraint_sql(position, complexity):
+    column = f'value_{position % CHECK_VALUE_COLUMNS}'
+    if complexity == 'comparison':
+        return f'CHECK ({column} >= 0)'
+    if complexity == 'expression':
+        other = f'value_{(position + 1) % CHECK_VALUE_COLUMNS}'
+        return (f"CHECK (abs({column} - {other}) < 1000000 AND ({column} * 3 + {other}) % 7 >= 0 "
+                f"AND length(label) BETWEEN 1 AND 100 AND label GLOB 'row_*')")
+    if complexity == 'function':
+        return f'CHECK (check_value_is_valid({column}))'
+    raise ValueError(f'Неизвестная сложность CHECK: {complexity!r}')
+
+
+def check_table_sql(check_count, complexity):
+    columns = [f'value_{position} INTEGER' for position in range(CHECK_VALUE_COLUMNS)]
+    checks = [check_constraint_sql(position, complexity) for position in range(check_count)]
+    return 'CREATE TABLE checked (\n    id INTEGER PRIMARY KEY,\n    label TEXT,\n    ' + ',\n    '.join(
+        columns + checks) + '\n);'
+
+
+def connect_check_table(check_count, complexity):
+    conn = sqlite3.connect(':memory:')
+    conn.create_function('check_value_is_valid', 1, check_value_is_valid, deterministic=True)
+    conn.execute(check_table_sql(check_count, complexity))
+    return conn
+
+
+def check_rows(row_count, start=0):
+    for position in range(start, start + row_count):
+        yield (position, f'row_{position}', *((position * (column + 1)) % 1_000_000 for column in range(CHECK_VALUE_COLUMNS)))
+
+
+def count_vm_steps(conn, function):
+    # Обработчик прогресса с шагом 1 вызывается на каждой инструкции VM
+    steps = 0
+
+    def count_step():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    conn.set_progress_handler(count_step, 1)
+    try:
+        function()
+    finally:
+        conn.set_progress_handler(None, 0)
+    return steps
+
+
+def bench_check_constraints(check_counts=CHECK_COUNTS, complexities=CHECK_COMPLEXITIES, row_count=CHECK_ROW_COUNT,
+                            step_rows=CHECK_STEP_ROWS, batch_size=BULK_BATCH_SIZE):
+    # Скорость вставки и число шагов VM на строку в зависимости от количества и сложности CHECK.
+    # Шаги считаются на отдельной небольшой загрузке, потому что обработчик прогресса сам замедляет вставку
+    placeholders = ', '.join('?' * (CHECK_VALUE_COLUMNS + 2))
+    insert_sql = f'INSERT INTO checked VALUES ({placeholders});'
+    results = []
+    for complexity, check_count in itertools.product(complexities, check_counts):
+        conn = connect_check_table(check_count, complexity)
+        seconds, _ = timed(bulk_load, conn, insert_sql, check_rows(row_count), batch_size)
+        steps = count_vm_steps(conn, lambda: bulk_load(conn, insert_sql, check_rows(step_rows, row_count), batch_size))
+
+        # Строка с отрицательным значением нарушает каждое ограничение
+        violation_raised = False
+        try:
+            conn.execute(insert_sql, (-1, 'row_-1', *([-1] * CHECK_VALUE_COLUMNS)))
+        except sqlite3.IntegrityError:
+            violation_raised = True
+        conn.close()
+        if violation_raised != bool(check_count):
+            raise AssertionError(f'{complexity}, {check_count} CHECK: IntegrityError - {violation_raised}')
+        results.append({
+            'complexity': complexity,
+            'checks': check_count,
+            'rows': row_count,
+            'seconds': seconds,
+            'rows_per_second': rate(row_count, seconds),
+            'vm_steps_per_row': steps / step_rows,
+        })
+    return results
+
+
+def shuffled_user_rows(row_count):
+    # Уникальные имена в перемешанном порядке: n * 7919 по модулю числа строк - перестановка
+    if row_count % 7919 == 0:
+        raise ValueError('Число строк не должно делиться на 7919')
+    for position in range(row_count):
+        yield position + 1, f'user_{position * 7919 % row_count:010d}'
+
+
+def bench_unique_build(row_counts=UNIQUE_BUILD_ROW_COUNTS, strategies=None, batch_size=BULK_BATCH_SIZE):
+    # Время загрузки и построения индекса для каждого способа. После построения сравниваются формы индексов
+    # и сообщения о дубликате, который вставляется после загрузки
+    strategies = strategies or tuple(helpers.UNIQUE_BUILD_STRATEGIES)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            shapes = {}
+            messages = {}
+            for strategy in strategies:
+                conn = sqlite3.connect(temporary_database(directory, 'unique.db'))
+                conn.execute('PRAGMA journal_mode = OFF;')
+                conn.execute('PRAGMA synchronous = OFF;')
+                load_seconds, _ = timed(
+                    helpers.load_unique_table, conn, strategy, shuffled_user_rows(row_count), batch_size)
+                index_seconds, _ = timed(helpers.index_unique_table, conn, strategy)
+                shapes[strategy] = helpers.unique_index_shapes(conn, 'users')
+                try:
+                    conn.execute("INSERT INTO users (name) VALUES ('user_0000000000');")
+                except sqlite3.IntegrityError as error:
+                    messages[strategy] = str(error)
+                conn.close()
+                results.append({
+                    'strategy': strategy,
+                    'rows': row_count,
+                    'load_seconds': load_seconds,
+                    'index_seconds': index_seconds,
+                    'seconds': load_seconds + index_seconds,
+                    'rows_per_second': rate(row_count, load_seconds + index_seconds),
+                })
+            first = strategies[0]
+            if any(shape != shapes[first] for shape in shapes.values()) or len(messages) != len(strategies) \
+                    or len(set(messages.values())) != 1:
+                raise AssertionError(f'Способы построения дают разные индексы {shapes} или ошибки {messages}')
+    return results
+
+
+def bench_clone(row_counts=CLONE_ROW_COUNTS, methods=CLONE_METHODS, batch_size=BULK_BATCH_SIZE):
+    # Время копии и что в ней сохранилось: PRIMARY KEY и индексы. backup() копирует всю базу в другой файл,
+    # поэтому его время растёт с размером базы, а не таблицы
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            path = temporary_database(directory, 'clone.db')
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA journal_mode = OFF;')
+            conn.execute('PRAGMA synchronous = OFF;')
+            conn.executescript(helpers.CTAS_SOURCE_SQL)
+            conn.execute(helpers.CTAS_FILL_SQL, (row_count,))
+            conn.commit()
+            for method in methods:
+                if method == 'clone':
+                    seconds, _ = timed(clone.clone_table, conn, 'source_cities', 'copied_cities', batch_size=batch_size)
+                    copy_conn, table = conn, 'copied_cities'
+                elif method == 'ctas':
+                    seconds, _ = timed(lambda: (conn.execute(
+                        'CREATE TABLE copied_cities AS SELECT * FROM source_cities;'), conn.commit()))
+                    copy_conn, table = conn, 'copied_cities'
+                else:
+                    copy_conn = sqlite3.connect(temporary_database(directory, 'backup.db'))
+                    copy_conn.execute('PRAGMA journal_mode = OFF;')
+                    copy_conn.execute('PRAGMA synchronous = OFF;')
+                    seconds, _ = timed(conn.backup, copy_conn)
+                    table = 'source_cities'
+                count = copy_conn.execute(f'SELECT count(*) FROM {table};').fetchone()[0]
+                primary_key = [row[1] for row in copy_conn.execute(f'PRAGMA table_info({table});') if row[5]]
+                indexes = len(copy_conn.execute(f'PRAGMA index_list({table});').fetchall())
+                if method == 'backup':
+                    copy_conn.close()
+                else:
+                    conn.execute('DROP TABLE copied_cities;')
+                    conn.commit()
+                if count != row_count:
+                    raise AssertionError(f'{method}: скопировано {count} строк из {row_count}')
+                results.append({
+                    'method': method,
+                    'rows': row_count,
+                    'seconds': seconds,
+                    'rows_per_second': rate(row_count, seconds),
+                    'primary_key': primary_key,
+                    'indexes': indexes,
+                })
+            conn.close()
+    return results
+
+
+def is_busy(error):
+    # SQLITE_BUSY и его расширенные коды, например SQLITE_BUSY_SNAPSHOT
+    return getattr(error, 'sqlite_errorname', '').startswith('SQLITE_BUSY')
+
+
+def execute_ddl(conn, sql, stats):
+    # DDL с повтором после SQLITE_BUSY. При timeout > 0 SQLite сам ждёт блокировку внутри вызова,
+    # поэтому время вызовов, завершившихся SQLITE_BUSY, и время успешных вызовов учитываются отдельно
+    while True:
+        started = time.perf_counter()
+        try:
+            conn.execute(sql)
+        except sqlite3.OperationalError as error:
+            if not is_busy(error):
+                raise
+            stats['busy'] += 1
+            stats['busy_seconds'] += time.perf_counter() - started
+            time.sleep(DDL_RETRY_DELAY)
+        else:
+            seconds = time.perf_counter() - started
+            stats['statements'] += 1
+            stats['statement_seconds'] += seconds
+            stats['max_statement_seconds'] = max(stats['max_statement_seconds'], seconds)
+            return
+
+
+def ddl_writer(path, writer, table_count, timeout, barrier, results):
+    # Писатель для потока или процесса: после общего старта пытается создать employees,
+    # затем создаёт свои таблицы, каждую в отдельной транзакции. Функция на уровне модуля,
+    # чтобы её можно было передать в процесс
+    stats = {
+        'writer': writer,
+        'created_contended_table': False,
+        'statements': 0,
+        'statement_seconds': 0.0,
+        'max_statement_seconds': 0.0,
+        'busy': 0,
+        'busy_seconds': 0.0,
+    }
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        barrier.wait()
+        # perf_counter - монотонные часы всей системы, поэтому отметки времени процессов можно сравнивать
+        stats['started'] = time.perf_counter()
+        try:
+            execute_ddl(conn, DDL_CONTENDED_TABLE_SQL, stats)
+            stats['created_contended_table'] = True
+        except sqlite3.OperationalError as error:
+            if 'already exists' not in str(error):
+                raise
+        for position in range(table_count):
+            execute_ddl(
+                conn, f'CREATE TABLE writer_{writer}_table_{position} (id INTEGER PRIMARY KEY, name TEXT NOT NULL);',
+                stats)
+        stats['finished'] = time.perf_counter()
+    except Exception as error:
+        stats['error'] = repr(error)
+    finally:
+        conn.close()
+    results.put(stats)
+
+
+def run_ddl_writers(path, mode, writer_count, table_count, timeout):
+    # Запуск писателей в потоках или процессах spawn: fork из процесса с потоками, например из runner.py
+    # --concurrency, может унаследовать захваченные другими потоками блокировки
+    if mode == 'threads':
+        import queue
+
+        barrier, results, worker = threading.Barrier(writer_count), queue.Queue(), threading.Thread
+    else:
+        context = multiprocessing.get_context('spawn')
+        barrier, results, worker = context.Barrier(writer_count), context.Queue(), context.Process
+    workers = [
+        worker(target=ddl_writer, args=(path, writer, table_count, timeout, barrier, results))
+        for writer in range(writer_count)
+    ]
+    for process in workers:
+        process.start()
+    # Очередь процессов читается до join: иначе процесс может ждать, пока освободится канал очереди
+    stats = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    return sorted(stats, key=lambda writer_stats: writer_stats['writer'])
+
+
+def bench_ddl_contention(writer_counts=DDL_WRITER_COUNTS, timeouts=DDL_TIMEOUTS, modes=DDL_MODES,
+                         table_count=DDL_TABLES_PER_WRITER):
+    # Доля SQLITE_BUSY, ожидание блокировки и пропускная способность DDL в зависимости от числа писателей.
+    # В WAL писатель один, поэтому CREATE TABLE выполняются по очереди при любом числе потоков и процессов
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in modes:
+            for writer_count in writer_counts:
+                for timeout in timeouts:
+                    path = temporary_database(directory, 'ddl_contention.db')
+                    conn = sqlite3.connect(path)
+                    conn.execute('PRAGMA journal_mode = WAL;')
+                    conn.close()
+                    stats = run_ddl_writers(path, mode, writer_count, table_count, timeout)
+                    errors = [writer_stats['error'] for writer_stats in stats if 'error' in writer_stats]
+                    if errors:
+                        raise AssertionError(f'{mode}, писателей {writer_count}: {errors}')
+                    creators = sum(writer_stats['created_contended_table'] for writer_stats in stats)
+                    conn = sqlite3.connect(path)
+                    tables = conn.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table';").fetchone()[0]
+                    conn.close()
+                    if creators != 1 or tables != writer_count * table_count + 1:
+                        raise AssertionError(
+                            f'{mode}, писателей {writer_count}: employees создали {creators} писателей, таблиц {tables}')
+                    statements = sum(writer_stats['statements'] for writer_stats in stats)
+                    busy = sum(writer_stats['busy'] for writer_stats in stats)
+                    seconds = (max(writer_stats['finished'] for writer_stats in stats)
+                               - min(writer_stats['started'] for writer_stats in stats))
+                    results.append({
+                        'mode': mode,
+                        'writers': writer_count,
+                        'timeout': timeout,
+                        'ddl_statements': statements,
+                        'seconds': seconds,
+                        'ddl_per_second': rate(statements, seconds),
+                        'busy_errors': busy,
+                        'busy_rate': busy / (busy + statements),
+                        'busy_wait_seconds': sum(writer_stats['busy_seconds'] for writer_stats in stats),
+                        'mean_statement_seconds': sum(
+                            writer_stats['statement_seconds'] for writer_stats in stats) / statements,
+                        'max_statement_seconds': max(writer_stats['max_statement_seconds'] for writer_stats in stats),
+                    })
+    return results
+
+
+def bench_catalog_lookups(table_counts=(10, 1000, 10000), lookups=10 * CATALOG_LOOKUPS,
+                          cache_sizes=STATEMENT_CACHE_SIZES, seed=0):
+    # Поиск таблиц по sqlite_master с именем в тексте запроса против привязанного параметра.
+    # Каждое новое имя в тексте - новый оператор, который приходится подготавливать заново
+    random_generator = random.Random(seed)
+    results = []
+    for table_count in table_counts:
+        table_names = [f'table_{position}' for position in range(table_count)]
+        sample = [random_generator.choice(table_names) for _ in range(lookups)]
+        for cache_size in cache_sizes:
+            conn = sqlite3.connect(':memory:', cached_statements=cache_size)
+            conn.execute('BEGIN;')
+            for table_name in table_names:
+                conn.execute(catalog_table_sql(table_name))
+            conn.commit()
+
+            def lookup_literal():
+                for table_name in sample:
+                    sql = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';"
+                    assert conn.execute(sql).fetchone() is not None
+
+            def lookup_bound():
+                for table_name in sample:
+                    assert helpers.catalog_object_exists(conn, 'table', table_name)
+
+            literal_seconds, _ = timed(lookup_literal)
+            bound_seconds, _ = timed(lookup_bound)
+            conn.close()
+            results.append({
+                'table_count': table_count,
+                'cached_statements': cache_size,
+                'lookups': lookups,
+                # Если различных имён меньше размера кэша, запросы с именем в тексте тоже берутся из кэша
+                'distinct_names': len(set(sample)),
+                'literal_lookups_per_second': rate(lookups, literal_seconds),
+                'bound_lookups_per_second': rate(lookups, bound_seconds),
+                'speedup': literal_seconds / bound_seconds if bound_seconds else None,
+            })
+    return results
+
+
+def bench_schema_inspector(table_counts=(10, 1000, 10000), lookups=CATALOG_LOOKUPS, seed=0):
+    # Обращения к схеме через SchemaInspector против чтения схемы таблицы и всего каталога при каждом обращении
+    random_generator = random.Random(seed)
+    results = []
+    for table_count in table_counts:
+        conn = sqlite3.connect(':memory:')
+        conn.execute('BEGIN;')
+        for position in range(table_count):
+            conn.execute(catalog_table_sql(f'table_{position}'))
+        conn.commit()
+        sample = [f'table_{random_generator.randrange(table_count)}' for _ in range(lookups)]
+        inspector = helpers.SchemaInspector(conn)
+
+        first_load_seconds, _ = timed(inspector.tables)
+        cached_seconds, _ = timed(lambda: [inspector.table(table) for table in sample])
+        per_table_seconds, _ = timed(lambda: [helpers.fetch_table_schema(conn, table) for table in sample])
+        full_reload_lookups = max(1, lookups // max(1, table_count // 10))
+        full_reload_seconds, _ = timed(lambda: [
+            helpers.group_table_schemas(conn.execute(helpers.CATALOG_SCHEMA_SQL))[table]
+            for table in sample[:full_reload_lookups]
+        ])
+        conn.close()
+        results.append({
+            'table_count': table_count,
+            'lookups': lookups,
+            'first_load_seconds': first_load_seconds,
+            'cached_lookups_per_second': rate(lookups, cached_seconds),
+            'per_table_query_lookups_per_second': rate(lookups, per_table_seconds),
+            'full_reload_lookups_per_second': rate(full_reload_lookups, full_reload_seconds),
+            'reloads': inspector.reloads,
+        })
+    return results
+
+
+class BackendTimingResult(unittest.TestResult):
+    # Результат, который собирает время тестов и их commit(), записанное TemplateDatabaseMixin.tearDown
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backend_timings = []
+
+    def stopTest(self, test):
+        timing = getattr(test, 'backend_timing', None)
+        if timing is not None:
+            self.backend_timings.append(timing)
+        super().stopTest(test)
+
+
+def bench_backends(repeat=5):
+    # Задержка DDL и commit() основного набора тестов на каждом бэкенде (память, файл с журналом, WAL)
+    import tests
+
+    results = []
+    for backend, test_case in tests.BACKEND_TEST_CASES.items():
+        records = []
+        for _ in range(repeat):
+            result = BackendTimingResult()
+            unittest.TestLoader().loadTestsFromTestCase(test_case).run(result)
+            if not result.wasSuccessful():
+                raise AssertionError(f'{backend}: тесты упали: {result.failures + result.errors}')
+            records.extend(record for record in result.backend_timings if record['backend'] == backend)
+        committed = [record for record in records if record['commits']]
+        commits = sum(record['commits'] for record in records)
+        commit_seconds = sum(record['commit_seconds'] for record in records)
+        results.append({
+            'backend': backend,
+            'tests': len(records),
+            'seconds': sum(record['seconds'] for record in records),
+            'commits': commits,
+            'commit_seconds': commit_seconds,
+            'mean_commit_seconds': commit_seconds / commits if commits else None,
+            'mean_ddl_and_commit_seconds': (
+                sum(record['seconds'] for record in committed) / len(committed) if committed else None
+            ),
+        })
+    return results
+
+
+BENCHMARKS = {
+    'catalog': bench_catalog,
+    'constraints': bench_constraints,
+    'backends': bench_backends,
+    'index_lookups': bench_index_lookups,
+    'foreign_keys': bench_foreign_keys,
+    'ctas': bench_ctas,
+    'checksums': bench_checksums,
+    'table_variants': bench_table_variants,
+    'autoincrement': bench_autoincrement,
+    'check_constraints': bench_check_constraints,
+    'unique_build': bench_unique_build,
+    'clone': bench_clone,
+    'ddl_contention': bench_ddl_contention,
+    'catalog_lookups': bench_catalog_lookups,
+    'schema_inspector': bench_schema_inspector,
+}
+
+# Уменьшенные параметры для быстрой проверки, что бенчмарки работают
+QUICK_PARAMETERS = {
+    'catalog': {'table_counts': (10, 100), 'column_counts': (10, 100), 'lookups': 100},
+    'constraints': {'row_counts': (10_000,)},
+    'backends': {'repeat': 1},
+    'index_lookups': {'row_counts': (10_000,), 'lookups': 200, 'scan_lookups': 5},
+    'foreign_keys': {'row_counts': (10_000,), 'parent_operations': 20},
+    'ctas': {'row_counts': (10_000,)},
+    'checksums': {'row_counts': (10_000,)},
+    'table_variants': {'row_counts': (10_000,), 'lookups': 200},
+    'autoincrement': {'row_counts': (10_000,), 'committed_rows': 100},
+    'check_constraints': {'check_counts': (0, 4, 64), 'row_count': 10_000, 'step_rows': 100},
+    'unique_build': {'row_counts': (10_000,)},
+    'clone': {'row_counts': (10_000,)},
+    'ddl_contention': {'writer_counts': (1, 4), 'timeouts': (0, 5.0), 'table_count': 10},
+    'catalog_lookups': {'table_counts': (100,), 'lookups': 200},
+    'schema_inspector': {'table_counts': (10, 100), 'lookups': 100},
+}
+
+
+def run_benchmarks(names, quick=False):
+    report = {
+        'sqlite_version': sqlite3.sqlite_version,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': {},
+    }
+    for name in names:
+        parameters = QUICK_PARAMETERS.get(name, {}) if quick else {}
+        seconds, results = timed(BENCHMARKS[name], **parameters)
+        report['benchmarks'][name] = {'parameters': parameters, 'seconds': seconds, 'results': results}
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки DDL и ограничений SQLite')
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"бенчмарки для запуска: {', '.join(sorted(BENCHMARKS))} (по умолчанию все)")
+    parser.add_argument('--quick', action='store_true', help='уменьшенные размеры данных')
+    parser.add_argument('-o', '--output', help='путь для результатов в формате JSON')
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.benchmarks) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"неизвестные бенчмарки: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args.benchmarks or sorted(BENCHMARKS), quick=args.quick)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
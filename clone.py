@@ -0,0 +1,232 @@
+import argparse
+import re
+import sqlite3
+import sys
+
+from helpers import quote_identifier
+
+# Строк в одном INSERT ... SELECT при копировании данных
+DEFAULT_BATCH_SIZE = 10_000
+
+# Идентификатор в тексте DDL: в двойных кавычках, квадратных скобках, обратных или одинарных кавычках либо без кавычек
+IDENTIFIER = r'''(?:"(?:[^"]|"")*"|\[[^\]]*\]|`(?:[^`]|``)*`|'(?:[^']|'')*'|[^\s(]+)'''
+# sqlite_master хранит DDL без имени схемы, поэтому имя объекта всегда стоит сразу после ключевых слов
+TABLE_DDL = re.compile(rf'^(CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?){IDENTIFIER}', re.IGNORECASE)
+INDEX_DDL = re.compile(
+    rf'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?){IDENTIFIER}(\s+ON\s+){IDENTIFIER}', re.IGNORECASE)
+TRIGGER_DDL = re.compile(
+    rf'^(CREATE\s+TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?){IDENTIFIER}(.*?\bON\s+){IDENTIFIER}',
+    re.IGNORECASE | re.DOTALL)
+
+# Лексемы SQL для поиска ссылок на таблицу: строки и комментарии пропускаются, идентификаторы сравниваются без кавычек
+TOKEN = re.compile(
+    r"""(?P<string>'(?:[^']|'')*')"""
+    r"""|(?P<quoted>"(?:[^"]|"")*"|\[[^\]]*\]|`(?:[^`]|``)*`)"""
+    r"""|(?P<comment>--[^\n]*|/\*.*?(?:\*/|$))"""
+    r"""|(?P<word>[A-Za-z_][\w$]*)"""
+    r"""|(?P<space>\s+)"""
+    r"""|(?P<other>.)""",
+    re.DOTALL)
+# Слова, после которых в теле триггера стоит имя таблицы
+TABLE_KEYWORDS = {'UPDATE', 'INTO', 'FROM', 'JOIN', 'REFERENCES'}
+# UPDATE OR REPLACE t: имя таблицы стоит после действия при конфликте
+CONFLICT_ACTIONS = {'ROLLBACK', 'ABORT', 'FAIL', 'IGNORE', 'REPLACE'}
+
+
+def unquote_identifier(token):
+    if token[0] == '[':
+        return token[1:-1]
+    if token[0] in '"`':
+        return token[1:-1].replace(token[0] * 2, token[0])
+    return token
+
+
+def clone_object_name(name, source, target):
+    # Имя индекса или триггера копии: имя исходной таблицы, стоящее в нём отдельным словом, заменяется на новое,
+    # иначе добавляется префикс. Совпадения внутри других слов (t в touch) не заменяются
+    whole_word = re.compile(rf'(?<![^\W_]){re.escape(source)}(?![^\W_])', re.IGNORECASE)
+    if whole_word.search(name):
+        return whole_word.sub(lambda match: target, name)
+    return f'{target}_{name}'
+
+
+def rename_table_references(sql, source, target, keywords=TABLE_KEYWORDS):
+    # Замена ссылок на исходную таблицу: имя после слов из keywords и квалификатор перед точкой (source.column).
+    # Возвращает новый текст и количество оставшихся упоминаний имени, которые нельзя однозначно отнести к таблице
+    tokens = [(match.lastgroup, match.group()) for match in TOKEN.finditer(sql)]
+    significant = [position for position, (kind, _) in enumerate(tokens) if kind not in ('space', 'comment')]
+    unresolved = 0
+    for order, position in enumerate(significant):
+        kind, text = tokens[position]
+        if kind not in ('word', 'quoted') or unquote_identifier(text).lower() != source.lower():
+            continue
+        previous = [tokens[significant[index]][1].upper() for index in (order - 2, order - 1) if index >= 0]
+        following = tokens[significant[order + 1]][1] if order + 1 < len(significant) else ''
+        if previous[-1:] == ['.']:
+            # new.source или alias.source - это столбец, а не таблица
+            continue
+        if (previous[-1:] and previous[-1] in keywords
+                or previous[-2:-1] == ['OR'] and previous[-1] in CONFLICT_ACTIONS
+                or following == '.'):
+            tokens[position] = (kind, quote_identifier(target))
+        else:
+            unresolved += 1
+    return ''.join(text for _, text in tokens), unresolved
+
+
+def rename_table_ddl(sql, target):
+    return TABLE_DDL.sub(lambda match: match.group(1) + quote_identifier(target), sql, count=1)
+
+
+def rename_index_ddl(sql, name, target):
+    return INDEX_DDL.sub(
+        lambda match: match.group(1) + quote_identifier(name) + match.group(2) + quote_identifier(target),
+        sql, count=1)
+
+
+def rename_trigger_ddl(sql, name, target):
+    # Меняются имя триггера и таблица после ON; тело триггера остаётся прежним
+    return TRIGGER_DDL.sub(
+        lambda match: match.group(1) + quote_identifier(name) + match.group(2) + quote_identifier(target),
+        sql, count=1)
+
+
+def table_ddl(conn, table):
+    # DDL таблицы и её индексов и триггеров. Автоиндексы UNIQUE и PRIMARY KEY (sql IS NULL)
+    # создаются вместе с таблицей. tbl_name индекса и триггера записан так, как имя таблицы написано
+    # в их DDL (ON Employees), поэтому имена сравниваются без учёта регистра, как в самом SQLite
+    rows = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = ? COLLATE NOCASE AND sql IS NOT NULL "
+        "ORDER BY rowid;", (table,)
+    ).fetchall()
+    ddl = {'table': None, 'index': [], 'trigger': []}
+    for object_type, name, sql in rows:
+        if object_type == 'table':
+            ddl['table'] = sql
+        elif object_type in ddl:
+            ddl[object_type].append((name, sql))
+    if ddl['table'] is None:
+        raise ValueError(f'Таблица {table!r} не найдена в sqlite_master')
+    return ddl
+
+
+def copy_rows(conn, source, target, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Копирование пачками INSERT ... SELECT по возрастанию rowid с фиксацией после каждой пачки,
+    # чтобы другие соединения могли писать в базу между пачками. rowid копируется как есть.
+    # У таблицы WITHOUT ROWID нет rowid, она копируется одним оператором
+    columns = [row[0] for row in conn.execute(
+        "SELECT name FROM pragma_table_xinfo(?) WHERE hidden = 0 ORDER BY cid;", (source,))]
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    total = conn.execute(f'SELECT count(*) FROM {quote_identifier(source)};').fetchone()[0]
+    without_rowid = conn.execute("SELECT wr FROM pragma_table_list(?);", (source,)).fetchone()[0]
+    copied = 0
+    if without_rowid:
+        copied = conn.execute(
+            f'INSERT INTO {quote_identifier(target)} ({column_list}) '
+            f'SELECT {column_list} FROM {quote_identifier(source)};').rowcount
+        conn.commit()
+        if progress is not None:
+            progress(copied, total)
+        return copied
+
+    insert_sql = (
+        f'INSERT INTO {quote_identifier(target)} (rowid, {column_list}) '
+        f'SELECT rowid, {column_list} FROM {quote_identifier(source)} WHERE rowid > ? ORDER BY rowid LIMIT ?;'
+    )
+    last_rowid = None
+    while True:
+        # Первая пачка начинается с наименьшего rowid, в том числе отрицательного
+        if last_rowid is None:
+            last_rowid = conn.execute(f'SELECT min(rowid) - 1 FROM {quote_identifier(source)};').fetchone()[0]
+            if last_rowid is None:
+                break
+        inserted = conn.execute(insert_sql, (last_rowid, batch_size)).rowcount
+        if inserted <= 0:
+            break
+        last_rowid = conn.execute(f'SELECT max(rowid) FROM {quote_identifier(target)};').fetchone()[0]
+        conn.commit()
+        copied += inserted
+        if progress is not None:
+            progress(copied, total)
+    return copied
+
+
+def copy_sequence(conn, source, target):
+    # Значение AUTOINCREMENT может быть больше max(id) после удалений; без переноса копия выдала бы эти id снова
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence';").fetchone():
+        return
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", (source,)).fetchone()
+    if row is None:
+        return
+    updated = conn.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?;", (row[0], target)).rowcount
+    if not updated:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?);", (target, row[0]))
+
+
+def clone_table(conn, source, target, copy_data=True, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Копия таблицы по её DDL из sqlite_master со всеми ограничениями, индексами и триггерами.
+    # Данные копируются до создания индексов и триггеров: индексы строятся один раз по загруженным данным,
+    # а триггеры на вставку не срабатывают на скопированных строках. Возвращает число скопированных строк
+    # Внешний ключ таблицы на саму себя и ссылки на неё в телах триггеров должны вести на копию:
+    # иначе триггер копии писал бы в исходную таблицу. DDL готовится целиком до создания копии
+    if conn.in_transaction:
+        # Копия фиксируется пачками, и первая же фиксация молча зафиксировала бы транзакцию вызывающего
+        raise ValueError('clone_table фиксирует копию пачками; завершите открытую транзакцию перед копированием')
+    ddl = table_ddl(conn, source)
+    table_sql, _ = rename_table_references(rename_table_ddl(ddl['table'], target), source, target, {'REFERENCES'})
+    index_sqls = [rename_index_ddl(sql, clone_object_name(name, source, target), target) for name, sql in ddl['index']]
+    trigger_sqls = []
+    for name, sql in ddl['trigger']:
+        trigger_sql, unresolved = rename_table_references(
+            rename_trigger_ddl(sql, clone_object_name(name, source, target), target), source, target)
+        if unresolved:
+            raise ValueError(
+                f'Триггер {name!r} упоминает {source!r} там, где это может быть и таблица, и столбец; '
+                f'скопируйте триггер вручную')
+        trigger_sqls.append(trigger_sql)
+
+    conn.execute(table_sql)
+    conn.commit()
+    try:
+        copied = copy_rows(conn, source, target, batch_size, progress) if copy_data else 0
+        for sql in index_sqls + trigger_sqls:
+            conn.execute(sql)
+        copy_sequence(conn, source, target)
+        conn.commit()
+    except BaseException:
+        # Таблица и пачки строк уже зафиксированы: при ошибке копия удаляется целиком,
+        # вместе с её индексами, триггерами и строкой sqlite_sequence
+        conn.rollback()
+        conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(target)};')
+        conn.commit()
+        raise
+    return copied
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Копия таблицы SQLite с ограничениями, индексами и триггерами')
+    parser.add_argument('database', help='путь к файлу базы')
+    parser.add_argument('source', help='исходная таблица')
+    parser.add_argument('target', help='имя копии')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='строк в одной пачке')
+    parser.add_argument('--schema-only', action='store_true', help='скопировать только схему, без данных')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.database)
+
+    def report_progress(copied, total):
+        sys.stderr.write(f'\r{copied}/{total} строк')
+
+    try:
+        copied = clone_table(conn, args.source, args.target, not args.schema_only, args.batch_size, report_progress)
+    finally:
+        conn.close()
+    sys.stderr.write(f'\nСкопировано строк: {copied}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
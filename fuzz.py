@@ -0,0 +1,314 @@
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+
+# Идентификатор: текст в SQL, имя после снятия кавычек и допустимость синтаксиса
+Identifier = namedtuple('Identifier', 'sql value valid')
+# Фрагмент определения: тип столбца или ограничение. references - имена столбцов, на которые он ссылается.
+# В ограничениях столбца '{name}' заменяется на имя самого столбца
+Fragment = namedtuple('Fragment', 'sql valid kind references')
+Column = namedtuple('Column', 'name type constraints')
+Case = namedtuple('Case', 'table columns table_constraints')
+
+# Ключевые слова, которые SQLite не принимает в качестве идентификатора без кавычек
+RESERVED_WORDS = ('table', 'select', 'from', 'where', 'create', 'order', 'group', 'index', 'primary',
+                  'default', 'check', 'null', 'not', 'unique', 'references', 'values', 'foreign')
+NAME_WORDS = ('cities', 'employees', 'users', 'products', 'settings', 'students', 'books', 'authors',
+              'пользователи', 'города', 'U', 'x')
+
+VALID_TYPES = ('', 'INTEGER', 'TEXT', 'REAL', 'BLOB', 'NUMERIC', 'VARCHAR(80)', 'DECIMAL(10, 2)', 'POINT',
+               'DATE', 'UNSIGNED BIG INT', 'DOUBLE PRECISION')
+INVALID_TYPES = ('VARCHAR()', 'VARCHAR(80, 2, 3)', 'INT((')
+
+VALID_COLUMN_CONSTRAINTS = (
+    ('NOT NULL', 'not_null'),
+    ('UNIQUE', 'unique'),
+    ('PRIMARY KEY', 'primary_key'),
+    ('PRIMARY KEY AUTOINCREMENT', 'autoincrement'),
+    ('CHECK({name} > 0)', 'check'),
+    ("DEFAULT 'light'", 'default'),
+    ('DEFAULT 0.0', 'default'),
+    ('DEFAULT -1', 'default'),
+    ("DEFAULT (DATE('now'))", 'default'),
+    ('DEFAULT NULL', 'default'),
+    ('DEFAULT CURRENT_TIMESTAMP', 'default'),
+    ('COLLATE NOCASE', 'collate'),
+    ('REFERENCES cities(id)', 'references'),
+)
+INVALID_COLUMN_CONSTRAINTS = (
+    ('CHECK({name} > )', 'check'),
+    ('DEFAULT', 'default'),
+    ("DEFAULT DATE('now')", 'default'),
+    ('NOT NUL', 'not_null'),
+    ('COLLATE missing_collation', 'collate'),
+)
+
+
+def ascii_lower(name):
+    # SQLite сравнивает идентификаторы без учёта регистра только для ASCII
+    return ''.join(character.lower() if character.isascii() else character for character in name)
+
+
+def quote(value, style):
+    if style == 'double':
+        return '"' + value.replace('"', '""') + '"'
+    if style == 'single':
+        return "'" + value.replace("'", "''") + "'"
+    if style == 'bracket':
+        return f'[{value}]'
+    return f'`{value}`'
+
+
+def generate_identifier(random_generator, invalid_rate):
+    if random_generator.random() < invalid_rate:
+        sql = random_generator.choice((
+            '23',
+            '2.07.2023',
+            'est!@#$%^&*()',
+            random_generator.choice(RESERVED_WORDS),
+            f'{random_generator.randrange(10)}{random_generator.choice(NAME_WORDS)}',
+        ))
+        return Identifier(sql, None, False)
+
+    word = random_generator.choice(NAME_WORDS)
+    variant = random_generator.randrange(6)
+    if variant == 0:
+        return Identifier(word, word, True)
+    if variant == 1:
+        value = f'{word}_{random_generator.randrange(100)}_$'
+        return Identifier(value, value, True)
+    if variant == 2:
+        return Identifier(quote('', random_generator.choice(('double', 'single'))), '', True)
+    if variant == 3:
+        value = random_generator.choice((f'my {word}', f'{word}"quoted', 'sqlite_' + word, word.upper()))
+        style = 'single' if "'" not in value and random_generator.random() < 0.3 else 'double'
+        return Identifier(quote(value, style), value, True)
+    value = random_generator.choice((f'my {word}', word, f'{word} {random_generator.randrange(10)}'))
+    return Identifier(quote(value, random_generator.choice(('bracket', 'backtick'))), value, True)
+
+
+def generate_type(random_generator, invalid_rate):
+    if random_generator.random() < invalid_rate:
+        return Fragment(random_generator.choice(INVALID_TYPES), False, 'type', ())
+    return Fragment(random_generator.choice(VALID_TYPES), True, 'type', ())
+
+
+def generate_column_constraint(random_generator, invalid_rate):
+    if random_generator.random() < invalid_rate:
+        sql, kind = random_generator.choice(INVALID_COLUMN_CONSTRAINTS)
+        return Fragment(sql, False, kind, ())
+    sql, kind = random_generator.choice(VALID_COLUMN_CONSTRAINTS)
+    return Fragment(sql, True, kind, ())
+
+
+def generate_table_constraint(random_generator, columns):
+    named = [column.name for column in columns if column.name.valid]
+    if named and random_generator.random() < 0.8:
+        picked = random_generator.sample(named, min(len(named), random_generator.randint(1, 2)))
+    else:
+        picked = [Identifier('missing_column', 'missing_column', True)]
+    names_sql = ', '.join(name.sql for name in picked)
+    references = tuple(name.value for name in picked)
+    sql, kind = random_generator.choice((
+        (f'PRIMARY KEY ({names_sql})', 'primary_key'),
+        (f'UNIQUE ({names_sql})', 'unique'),
+        (f'CHECK ({picked[0].sql} IS NOT NULL)', 'check'),
+        (f'FOREIGN KEY({picked[0].sql}) REFERENCES cities(id)', 'foreign_key'),
+    ))
+    if kind in ('check', 'foreign_key'):
+        references = references[:1]
+    return Fragment(sql, True, kind, references)
+
+
+def generate_case(random_generator, invalid_rate=0.05):
+    columns = []
+    for _ in range(random_generator.choice((0, 1, 2, 2, 3, 3, 4, 5))):
+        constraints = tuple(
+            generate_column_constraint(random_generator, invalid_rate)
+            for _ in range(random_generator.choice((0, 0, 1, 1, 2, 3)))
+        )
+        columns.append(Column(
+            generate_identifier(random_generator, invalid_rate),
+            generate_type(random_generator, invalid_rate),
+            constraints,
+        ))
+    table_constraints = tuple(
+        generate_table_constraint(random_generator, columns)
+        for _ in range(random_generator.choice((0, 0, 0, 1, 2)))
+    )
+    return Case(generate_identifier(random_generator, invalid_rate), tuple(columns), table_constraints)
+
+
+def generate_cases(seed, count, invalid_rate=0.05):
+    random_generator = random.Random(seed)
+    return [generate_case(random_generator, invalid_rate) for _ in range(count)]
+
+
+def render(case):
+    definitions = []
+    for column in case.columns:
+        parts = [column.name.sql, column.type.sql]
+        parts.extend(constraint.sql.replace('{name}', column.name.sql) for constraint in column.constraints)
+        definitions.append(' '.join(part for part in parts if part))
+    definitions.extend(constraint.sql for constraint in case.table_constraints)
+    return f"CREATE TABLE {case.table.sql} ({', '.join(definitions)});"
+
+
+def predict(case):
+    # Ожидаемый исход CREATE TABLE: True - таблица создаётся, False - OperationalError
+    if not case.table.valid or ascii_lower(case.table.value).startswith('sqlite_'):
+        return False
+    if not case.columns:
+        return False
+    names = set()
+    primary_keys = 0
+    for column in case.columns:
+        if not column.name.valid or not column.type.valid:
+            return False
+        name = ascii_lower(column.name.value)
+        if name in names:
+            return False
+        names.add(name)
+        for constraint in column.constraints:
+            if not constraint.valid:
+                return False
+            if constraint.kind in ('primary_key', 'autoincrement'):
+                primary_keys += 1
+            if constraint.kind == 'autoincrement' and column.type.sql.upper() != 'INTEGER':
+                return False
+    for constraint in case.table_constraints:
+        if any(ascii_lower(reference) not in names for reference in constraint.references):
+            return False
+        if constraint.kind == 'primary_key':
+            primary_keys += 1
+    return primary_keys <= 1
+
+
+def drop_table(conn, name):
+    conn.execute('DROP TABLE "' + name.replace('"', '""') + '";')
+
+
+def execute_case(conn, case):
+    # Выполняет CREATE TABLE и удаляет созданную таблицу; возвращает True или текст ошибки
+    try:
+        conn.execute(render(case))
+    except sqlite3.OperationalError as error:
+        return str(error)
+    try:
+        # Имя известно заранее, поиск по sqlite_master нужен только при неверном предсказании
+        drop_table(conn, case.table.value)
+    except (sqlite3.OperationalError, TypeError):
+        name = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\';").fetchone()[0]
+        drop_table(conn, name)
+    return True
+
+
+def is_mismatch(conn, case):
+    try:
+        outcome = execute_case(conn, case)
+    except sqlite3.Error:
+        # Любая ошибка, кроме OperationalError, не ожидается для CREATE TABLE
+        return True
+    return (outcome is True) != predict(case)
+
+
+def shrink(case, still_failing):
+    # Жадное упрощение случая, пока still_failing(case) остаётся истинным
+    simple_table = Identifier('t', 't', True)
+    simple_type = Fragment('', True, 'type', ())
+    changed = True
+    while changed:
+        changed = False
+        candidates = []
+        if case.table != simple_table:
+            candidates.append(case._replace(table=simple_table))
+        for position in range(len(case.table_constraints)):
+            candidates.append(case._replace(
+                table_constraints=case.table_constraints[:position] + case.table_constraints[position + 1:]))
+        for position, column in enumerate(case.columns):
+            candidates.append(case._replace(columns=case.columns[:position] + case.columns[position + 1:]))
+            if column.type != simple_type:
+                simpler = column._replace(type=simple_type)
+                candidates.append(case._replace(
+                    columns=case.columns[:position] + (simpler,) + case.columns[position + 1:]))
+            for index in range(len(column.constraints)):
+                simpler = column._replace(constraints=column.constraints[:index] + column.constraints[index + 1:])
+                candidates.append(case._replace(
+                    columns=case.columns[:position] + (simpler,) + case.columns[position + 1:]))
+        for candidate in candidates:
+            if still_failing(candidate):
+                case = candidate
+                changed = True
+                break
+    return case
+
+
+def run_fuzz(seed=0, count=10000, invalid_rate=0.05):
+    cases = generate_cases(seed, count, invalid_rate)
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    mismatches = []
+    valid = 0
+    started = time.perf_counter()
+    for case in cases:
+        expected = predict(case)
+        valid += expected
+        try:
+            outcome = execute_case(conn, case)
+            mismatch = (outcome is True) != expected
+        except sqlite3.Error as error:
+            outcome = f'{type(error).__name__}: {error}'
+            mismatch = True
+        if mismatch:
+            mismatches.append((case, expected, outcome))
+    elapsed = time.perf_counter() - started
+
+    reproducers = []
+    for case, expected, outcome in mismatches:
+        minimal = shrink(case, lambda candidate: is_mismatch(conn, candidate))
+        reproducers.append({
+            'sql': render(case),
+            'minimal_sql': render(minimal),
+            'expected_success': expected,
+            'outcome': outcome,
+        })
+    conn.close()
+    return {
+        'seed': seed,
+        'count': count,
+        'predicted_valid': valid,
+        'predicted_invalid': count - valid,
+        'seconds': elapsed,
+        'statements_per_second': count / elapsed if elapsed else None,
+        'mismatches': reproducers,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Детерминированный фаззер CREATE TABLE')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-n', '--count', type=int, default=10000, help='количество операторов')
+    parser.add_argument('--invalid-rate', type=float, default=0.05,
+                        help='вероятность недопустимого фрагмента в каждой позиции')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_fuzz(args.seed, args.count, args.invalid_rate)
+    print(f"seed={report['seed']} statements={report['count']} "
+          f"valid={report['predicted_valid']} invalid={report['predicted_invalid']} "
+          f"{report['statements_per_second']:.0f} statements/s")
+    for mismatch in report['mismatches']:
+        expected = 'успех' if mismatch['expected_success'] else 'OperationalError'
+        print(f"\nОжидалось: {expected}, получено: {mismatch['outcome']}")
+        print(f"  {mismatch['sql']}")
+        print(f"  минимальный пример: {mismatch['minimal_sql']}")
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,583 @@
+import hashlib
+import itertools
+import re
+import sqlite3
+
+
+def _statement_line(buffer_line, text):
+    # Номер строки первого непробельного символа text, если text начинается со строки buffer_line
+    return buffer_line + text[:len(text) - len(text.lstrip())].count('\n')
+
+
+def iter_statements(source):
+    # Потоковое разбиение SQL-скрипта на операторы по sqlite3.complete_statement.
+    # source - строка со скриптом или файловый объект; возвращает (индекс, номер строки, оператор).
+    # Точки с запятой внутри строковых литералов, CHECK и тел триггеров не разрывают оператор
+    lines = source.splitlines(keepends=True) if isinstance(source, str) else source
+    buffer = ''
+    buffer_line = 1
+    search_from = 0
+    index = 0
+    for line in lines:
+        buffer += line
+        while (end := buffer.find(';', search_from)) != -1:
+            # Полнота префикса не зависит от последующего текста, поэтому проверенные ';' не пересматриваются
+            if not sqlite3.complete_statement(buffer[:end + 1]):
+                search_from = end + 1
+                continue
+            statement = buffer[:end + 1]
+            yield index, _statement_line(buffer_line, statement), statement.strip()
+            index += 1
+            buffer_line += statement.count('\n')
+            buffer = buffer[end + 1:]
+            search_from = 0
+    if buffer.strip():
+        yield index, _statement_line(buffer_line, buffer), buffer.strip()
+
+
+def _annotate_script_error(error, index, line_number, statement):
+    error.statement_index = index
+    error.line_number = line_number
+    error.statement = statement
+    error.add_note(f'Оператор #{index} (строка {line_number}): {statement}')
+    return error
+
+
+# Начало и конец транзакции скрипта, например BEGIN TRANSACTION и COMMIT из вывода .dump.
+# ROLLBACK TO откатывает только до точки сохранения и транзакцию не завершает
+TRANSACTION_BEGIN = re.compile(r'BEGIN\b', re.IGNORECASE)
+TRANSACTION_END = re.compile(r'(?:COMMIT|END|ROLLBACK)\b(?!\s+(?:TRANSACTION\s+)?TO\b)', re.IGNORECASE)
+
+
+def _in_script_transaction(in_transaction, statement):
+    if in_transaction:
+        return not TRANSACTION_END.match(statement)
+    return bool(TRANSACTION_BEGIN.match(statement))
+
+
+def execute_script(conn, source, batch_size=None):
+    # Выполнение SQL-скрипта. Ошибка sqlite3 пробрасывается как есть, но с атрибутами statement_index,
+    # line_number и statement.
+    # Без batch_size операторы выполняются по одному, с batch_size - пачками через executescript: это быстрее,
+    # но executescript сначала фиксирует открытую транзакцию. Поэтому транзакция самого скрипта
+    # (BEGIN ... COMMIT, как в выводе .dump) выполняется одним вызовом executescript целиком, а пока открыта
+    # транзакция вызывающего кода, которую commit() не завершает (SAVEPOINT теста в SavepointConnection),
+    # пачки выполняются по одному оператору.
+    # После успешного выполнения состояние транзакции в обоих режимах одинаково: conn.commit() фиксирует
+    # неявную транзакцию, открытую DML скрипта, и транзакцию, открытую до вызова. Открытой остаётся только
+    # транзакция, которую скрипт начал и не завершил. При ошибке фиксация не выполняется
+    cursor = conn.cursor()
+    script_transaction = False
+    if batch_size is None:
+        for item in iter_statements(source):
+            _execute_statements(cursor, [item])
+            script_transaction = _in_script_transaction(script_transaction, item[2])
+    else:
+        batch = []
+        for item in iter_statements(source):
+            if not script_transaction and TRANSACTION_BEGIN.match(item[2]) and batch:
+                _execute_batch(conn, cursor, batch)
+                batch = []
+            batch.append(item)
+            ended = script_transaction and TRANSACTION_END.match(item[2])
+            script_transaction = _in_script_transaction(script_transaction, item[2])
+            # Следующий вызов executescript зафиксировал бы транзакцию скрипта раньше её COMMIT
+            if ended or not script_transaction and len(batch) >= batch_size:
+                _execute_batch(conn, cursor, batch)
+                batch = []
+        if batch:
+            _execute_batch(conn, cursor, batch)
+    if not script_transaction:
+        conn.commit()
+
+
+def _execute_statements(cursor, statements):
+    for index, line_number, statement in statements:
+        try:
+            cursor.execute(statement)
+        except sqlite3.Error as error:
+            raise _annotate_script_error(error, index, line_number, statement)
+
+
+def _execute_batch(conn, cursor, batch):
+    if conn.in_transaction:
+        # Транзакцию вызывающего кода executescript зафиксировал бы первым делом
+        _execute_statements(cursor, batch)
+        return
+    script = '\n'.join(statement for _, _, statement in batch)
+    # Транзакция скрипта откатывается сама по себе, остальные пачки - до точки сохранения
+    own_transaction = TRANSACTION_BEGIN.match(batch[0][2])
+    try:
+        cursor.executescript(script if own_transaction else f'SAVEPOINT script_batch;\n{script}\nRELEASE script_batch;')
+    except sqlite3.Error:
+        # Откатываем пачку и повторяем её по одному оператору, чтобы найти точное место ошибки.
+        # Если повтор прошёл без ошибок, пачка применена и ошибку пробрасывать не нужно
+        if conn.in_transaction and own_transaction:
+            cursor.execute('ROLLBACK;')
+        elif conn.in_transaction:
+            cursor.execute('ROLLBACK TO script_batch;')
+            cursor.execute('RELEASE script_batch;')
+        _execute_statements(cursor, batch)
+
+
+# Таблица из test_create_table_with_index с дополнительным столбцом, чтобы отличать покрывающий индекс
+INDEXED_TABLE_SQL = """
+CREATE TABLE indexed_table (
+    id INTEGER PRIMARY KEY,
+    column_to_index TEXT,
+    payload TEXT
+);
+"""
+
+# Варианты индекса на column_to_index и запросы, которые должны его использовать
+INDEX_VARIANTS = {
+    'plain': {
+        'index_sql': 'CREATE INDEX idx_column_to_index ON indexed_table (column_to_index);',
+        'index_name': 'idx_column_to_index',
+        'equality_sql': 'SELECT payload FROM indexed_table WHERE column_to_index = ?;',
+        'range_sql': 'SELECT payload FROM indexed_table WHERE column_to_index BETWEEN ? AND ?;',
+    },
+    'covering': {
+        'index_sql': 'CREATE INDEX idx_column_to_index_covering ON indexed_table (column_to_index, payload);',
+        'index_name': 'idx_column_to_index_covering',
+        'equality_sql': 'SELECT payload FROM indexed_table WHERE column_to_index = ?;',
+        'range_sql': 'SELECT payload FROM indexed_table WHERE column_to_index BETWEEN ? AND ?;',
+    },
+    'partial': {
+        'index_sql': 'CREATE INDEX idx_column_to_index_partial ON indexed_table (column_to_index) '
+                     'WHERE column_to_index IS NOT NULL;',
+        'index_name': 'idx_column_to_index_partial',
+        'equality_sql': 'SELECT payload FROM indexed_table WHERE column_to_index = ?;',
+        'range_sql': 'SELECT payload FROM indexed_table WHERE column_to_index BETWEEN ? AND ?;',
+    },
+    'expression': {
+        'index_sql': 'CREATE INDEX idx_column_to_index_lower ON indexed_table (lower(column_to_index));',
+        'index_name': 'idx_column_to_index_lower',
+        'equality_sql': 'SELECT payload FROM indexed_table WHERE lower(column_to_index) = ?;',
+        'range_sql': 'SELECT payload FROM indexed_table WHERE lower(column_to_index) BETWEEN ? AND ?;',
+    },
+}
+
+
+def query_plan(conn, sql, parameters=()):
+    # Строки detail из EXPLAIN QUERY PLAN
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, parameters)]
+
+
+def uses_index(plan, index_name):
+    return any(re.search(rf'\bINDEX {re.escape(index_name)}\b', detail) for detail in plan)
+
+
+# Родительские и дочерние таблицы из тестов на внешние ключи
+FOREIGN_KEY_SCHEMA_SQL = """
+CREATE TABLE cities (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(80),
+    location POINT
+);
+
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(80) NOT NULL,
+    age INTEGER,
+    city_id INTEGER,
+    FOREIGN KEY(city_id) REFERENCES cities(id)
+);
+
+CREATE TABLE authors (
+    author_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE publishers (
+    publisher_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE books (
+    book_id INTEGER PRIMARY KEY,
+    author_id INTEGER,
+    publisher_id INTEGER,
+    FOREIGN KEY(author_id) REFERENCES authors(author_id),
+    FOREIGN KEY(publisher_id) REFERENCES publishers(publisher_id)
+);
+"""
+
+# Индексы по дочерним столбцам внешних ключей
+CHILD_INDEXES_SQL = """
+CREATE INDEX idx_employees_city_id ON employees (city_id);
+CREATE INDEX idx_books_author_id ON books (author_id);
+CREATE INDEX idx_books_publisher_id ON books (publisher_id);
+"""
+
+
+def unindexed_foreign_keys(conn):
+    # Внешние ключи, для дочерних столбцов которых нет индекса с теми же ведущими столбцами.
+    # Без такого индекса каждое удаление или изменение ключа родителя сканирует всю дочернюю таблицу
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")]
+    missing = []
+    for table in tables:
+        foreign_keys = {}
+        for foreign_key_id, _, parent, child_column, *_ in conn.execute(
+                "SELECT * FROM pragma_foreign_key_list(?) ORDER BY id, seq;", (table,)):
+            foreign_keys.setdefault(foreign_key_id, (parent, []))[1].append(child_column)
+        if not foreign_keys:
+            continue
+        # Первичный ключ тоже индекс: INTEGER PRIMARY KEY - это rowid, и в pragma_index_list его нет,
+        # а таблица WITHOUT ROWID упорядочена по первичному ключу
+        primary_key = [row[0] for row in conn.execute(
+            "SELECT name FROM pragma_table_info(?) WHERE pk > 0 ORDER BY pk;", (table,))]
+        indexed_prefixes = [primary_key] if primary_key else []
+        for (index_name,) in conn.execute("SELECT name FROM pragma_index_list(?);", (table,)):
+            columns = [row[0] for row in conn.execute(
+                "SELECT name FROM pragma_index_info(?) ORDER BY seqno;", (index_name,))]
+            indexed_prefixes.append(columns)
+        for parent, child_columns in foreign_keys.values():
+            if not any(sorted(columns[:len(child_columns)]) == sorted(child_columns) for columns in indexed_prefixes):
+                missing.append((table, tuple(child_columns), parent))
+    return sorted(missing)
+
+
+SCHEMA_SQL_TEMPLATE = """
+WITH target AS (
+    SELECT name FROM sqlite_master WHERE type = 'table'{condition}
+)
+SELECT t.name, 'table', NULL, NULL, NULL, NULL, NULL, NULL
+FROM target AS t
+UNION ALL
+SELECT t.name, 'column', c.cid, c.name, c.type, c."notnull", c.dflt_value, c.pk
+FROM target AS t JOIN pragma_table_info(t.name) AS c
+UNION ALL
+SELECT t.name, 'foreign_key', f.id, f.seq, f."table", f."from", f."to", NULL
+FROM target AS t JOIN pragma_foreign_key_list(t.name) AS f
+UNION ALL
+SELECT t.name, 'index', NULL, i.name, i."unique", i.origin, i.partial, NULL
+FROM target AS t JOIN pragma_index_list(t.name) AS i;
+"""
+TABLE_SCHEMA_SQL = SCHEMA_SQL_TEMPLATE.format(condition=' AND name = ?')
+CATALOG_SCHEMA_SQL = SCHEMA_SQL_TEMPLATE.format(condition='')
+
+
+def group_table_schemas(rows):
+    # Столбцы в формате PRAGMA table_info, внешние ключи - (id, seq, table, from, to): по id столбцы
+    # составного ключа отличаются от нескольких ключей по одному столбцу; индексы - (name, unique, origin, partial)
+    schemas = {}
+    for table, kind, position, name, *attributes in rows:
+        schema = schemas.setdefault(table, {'columns': [], 'foreign_keys': [], 'indexes': []})
+        if kind == 'column':
+            schema['columns'].append((position, name, *attributes[:4]))
+        elif kind == 'foreign_key':
+            schema['foreign_keys'].append((position, name, *attributes[:3]))
+        elif kind == 'index':
+            schema['indexes'].append((name, *attributes[:3]))
+    for schema in schemas.values():
+        for part in schema.values():
+            part.sort()
+    return schemas
+
+
+def fetch_table_schema(conn, table):
+    # Столбцы, внешние ключи и индексы таблицы одним запросом; None, если таблицы нет
+    return group_table_schemas(conn.execute(TABLE_SCHEMA_SQL, (table,))).get(table)
+
+
+# Текст DDL всех объектов в порядке создания: внутри транзакции версия схемы неоднозначна,
+# и ключ кэша дополняется этим текстом (запрос в десятки раз дешевле перечитывания каталога)
+SCHEMA_SQL_SNAPSHOT = "SELECT group_concat(sql, char(0)) FROM (SELECT sql FROM sqlite_master ORDER BY rowid);"
+
+
+class SchemaInspector:
+    # Кэш схемы соединения: все таблицы, столбцы, индексы и внешние ключи читаются одним запросом
+    # и перечитываются, только если изменился ключ схемы. Вне транзакции ключ - PRAGMA schema_version
+    # (её меняет любой DDL, в том числе из других соединений к тому же файлу). ROLLBACK и ROLLBACK TO
+    # возвращают прежнюю версию схемы, и следующий DDL может снова дать уже закэшированную версию
+    # с другой схемой, поэтому внутри транзакции к версии добавляется текст DDL из sqlite_master
+    def __init__(self, conn):
+        self.conn = conn
+        self.reloads = 0
+        self._schema_key = None
+        self._schemas = {}
+
+    def _key(self):
+        schema_version = self.conn.execute('PRAGMA schema_version;').fetchone()[0]
+        if not self.conn.in_transaction:
+            return schema_version, None
+        return schema_version, self.conn.execute(SCHEMA_SQL_SNAPSHOT).fetchone()[0]
+
+    def _current(self):
+        schema_key = self._key()
+        if schema_key != self._schema_key:
+            self._schemas = group_table_schemas(self.conn.execute(CATALOG_SCHEMA_SQL))
+            self._schema_key = schema_key
+            self.reloads += 1
+        return self._schemas
+
+    def tables(self):
+        return sorted(self._current())
+
+    def has_table(self, table):
+        return table in self._current()
+
+    def table(self, table):
+        return self._current().get(table)
+
+    def columns(self, table):
+        return self._current()[table]['columns']
+
+    def foreign_keys(self, table):
+        return self._current()[table]['foreign_keys']
+
+    def indexes(self, table):
+        return self._current()[table]['indexes']
+
+
+# Поиск объекта каталога с привязанными параметрами: текст запроса один для всех имён,
+# поэтому подготовленный оператор переиспользуется из кэша соединения (cached_statements)
+CATALOG_OBJECT_SQL = "SELECT name FROM sqlite_master WHERE type = ? AND name = ?;"
+
+
+def catalog_object_exists(conn, object_type, name):
+    return conn.execute(CATALOG_OBJECT_SQL, (object_type, name)).fetchone() is not None
+
+
+# Исходная таблица для копирования через CREATE TABLE ... AS SELECT со всеми видами ограничений
+CTAS_SOURCE_SQL = """
+CREATE TABLE countries (
+    id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE source_cities (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(80) NOT NULL,
+    population INTEGER DEFAULT 0 CHECK(population >= 0),
+    code TEXT UNIQUE,
+    location POINT,
+    country_id INTEGER REFERENCES countries(id)
+);
+
+CREATE INDEX idx_source_cities_name ON source_cities (name);
+
+INSERT INTO countries (id) VALUES (1);
+"""
+
+# Заполнение source_cities строками 1..N без передачи данных из Python
+CTAS_FILL_SQL = """
+WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < ?)
+INSERT INTO source_cities (id, name, population, code, location, country_id)
+SELECT n, 'city_' || n, n % 100000, printf('C%010d', n), n * 7, 1 FROM numbers;
+"""
+
+
+def iter_fetchmany(cursor, size=None):
+    # Потоковое чтение результата порциями fetchmany, не загружая его целиком в память
+    size = size or cursor.arraysize
+    while rows := cursor.fetchmany(size):
+        yield from rows
+
+
+def first_difference(left_rows, right_rows):
+    # Индекс и пара первых различающихся строк двух потоков или None; более короткий поток дополняется None
+    for index, (left, right) in enumerate(itertools.zip_longest(left_rows, right_rows)):
+        if left != right:
+            return index, left, right
+    return None
+
+
+def ctas_source_rows(row_count):
+    # Строки, которые CTAS_FILL_SQL записывает в source_cities, для вычисления ожидаемых значений в Python
+    for n in range(1, row_count + 1):
+        yield n, f'city_{n}', n % 100000, f'C{n:010d}', n * 7, 1
+
+
+def row_hash(values):
+    # 64-битный хеш строки; repr различает 1, 1.0, '1' и b'1'
+    return int.from_bytes(hashlib.blake2b(repr(tuple(values)).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class RowHashAggregate:
+    # Агрегат row_hash(столбцы...): сумма хешей строк по модулю 2**64.
+    # Не зависит от порядка строк, но учитывает повторы и значения всех переданных столбцов
+    def __init__(self):
+        self.total = 0
+
+    def step(self, *values):
+        self.total = (self.total + row_hash(values)) % 2 ** 64
+
+    def finalize(self):
+        # Целые SQLite - знаковые 64-битные
+        return self.total - 2 ** 64 if self.total >= 2 ** 63 else self.total
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_fingerprint(conn, table, numeric_columns=(), columns=None):
+    # Отпечаток таблицы, вычисленный внутри SQLite: count(*), total() числовых столбцов и row_hash
+    # всех столбцов. В Python передаётся одна строка вместо всей таблицы
+    if columns is None:
+        columns = [row[0] for row in conn.execute("SELECT name FROM pragma_table_info(?) ORDER BY cid;", (table,))]
+    conn.create_aggregate('row_hash', -1, RowHashAggregate)
+    expressions = ['count(*)']
+    expressions += [f'total({quote_identifier(column)})' for column in numeric_columns]
+    expressions.append(f"row_hash({', '.join(quote_identifier(column) for column in columns)})")
+    count, *totals, hash_value = conn.execute(
+        f"SELECT {', '.join(expressions)} FROM {quote_identifier(table)};").fetchone()
+    return {'count': count, 'totals': dict(zip(numeric_columns, totals)), 'row_hash': hash_value}
+
+
+def expected_fingerprint(rows, columns, numeric_columns=()):
+    # Тот же отпечаток для ожидаемых строк за один проход по генератору
+    positions = [columns.index(column) for column in numeric_columns]
+    count = 0
+    totals = [0.0] * len(positions)
+    aggregate = RowHashAggregate()
+    for row in rows:
+        count += 1
+        for number, position in enumerate(positions):
+            if row[position] is not None:
+                totals[number] += row[position]
+        aggregate.step(*row)
+    return {'count': count, 'totals': dict(zip(numeric_columns, totals)), 'row_hash': aggregate.finalize()}
+
+
+# Варианты таблицы: обычная rowid-таблица, WITHOUT ROWID, STRICT и оба сразу
+TABLE_VARIANTS = {
+    'rowid': '',
+    'without_rowid': ' WITHOUT ROWID',
+    'strict': ' STRICT',
+    'without_rowid_strict': ' WITHOUT ROWID, STRICT',
+}
+
+# Схемы позитивных тестов для проверки вариантов; cities не проходит STRICT из-за типов VARCHAR(80) и POINT,
+# cities_without_primary_key не проходит WITHOUT ROWID
+VARIANT_SCHEMAS = {
+    'students': """
+    CREATE TABLE students (
+        student_id INTEGER,
+        course_id INTEGER,
+        PRIMARY KEY (student_id, course_id)
+    );
+    """,
+    'settings': """
+    CREATE TABLE settings (
+        id INTEGER PRIMARY KEY,
+        theme TEXT DEFAULT 'light'
+    );
+    """,
+    'codes': """
+    CREATE TABLE codes (
+        code TEXT PRIMARY KEY,
+        value REAL NOT NULL
+    );
+    """,
+    'cities': """
+    CREATE TABLE cities (
+        id INTEGER PRIMARY KEY,
+        name VARCHAR(80),
+        location POINT
+    );
+    """,
+    'cities_without_primary_key': """
+    CREATE TABLE cities_without_primary_key (
+        id INTEGER,
+        name TEXT
+    );
+    """,
+}
+
+# Таблица с составным ключом для бенчмарка вариантов
+COMPOSITE_KEY_TABLE_SQL = """
+CREATE TABLE enrollments (
+    student_id INTEGER,
+    course_id INTEGER,
+    grade INTEGER,
+    note TEXT,
+    PRIMARY KEY (student_id, course_id)
+)
+"""
+
+
+def table_variant_sql(create_table_sql, variant):
+    return create_table_sql.strip().rstrip(';') + TABLE_VARIANTS[variant] + ';'
+
+
+def expected_variant_columns(columns, variant):
+    # Столбцы PRIMARY KEY получают NOT NULL в WITHOUT ROWID и в STRICT, кроме псевдонима rowid
+    # (единственного INTEGER PRIMARY KEY в rowid-таблице)
+    primary_key = [column for column in columns if column[5]]
+    rowid_alias = variant in ('rowid', 'strict') and len(primary_key) == 1 and primary_key[0][2].upper() == 'INTEGER'
+    if variant == 'rowid' or rowid_alias:
+        return list(columns)
+    return [(cid, name, type_name, 1 if pk else notnull, default, pk)
+            for cid, name, type_name, notnull, default, pk in columns]
+
+
+# Таблица с AUTOINCREMENT и такая же с обычным INTEGER PRIMARY KEY
+PRIMARY_KEY_VARIANTS = {
+    'autoincrement': "CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, price REAL);",
+    'integer_primary_key': "CREATE TABLE products (id INTEGER PRIMARY KEY, price REAL);",
+}
+
+# Наибольший rowid
+MAX_ROWID = 2 ** 63 - 1
+
+
+# Три способа получить таблицу users с уникальным name: UNIQUE в определении столбца,
+# загрузка без ограничения и CREATE UNIQUE INDEX после неё, то же с большим кэшем страниц на время построения
+UNIQUE_BUILD_STRATEGIES = {
+    'inline_unique': {
+        'table_sql': "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(80) UNIQUE NOT NULL);",
+        'index_sql': None,
+        'cache_size': None,
+    },
+    'load_then_index': {
+        'table_sql': "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL);",
+        'index_sql': "CREATE UNIQUE INDEX idx_users_name ON users (name);",
+        'cache_size': None,
+    },
+    'load_then_index_large_cache': {
+        'table_sql': "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL);",
+        'index_sql': "CREATE UNIQUE INDEX idx_users_name ON users (name);",
+        # В КиБ, 256 МБ вместо 2 МБ по умолчанию
+        'cache_size': -262144,
+    },
+}
+
+
+def load_unique_table(conn, strategy, rows, batch_size=10_000):
+    # Создание и загрузка users пачками в одной неявной транзакции sqlite3
+    conn.execute(UNIQUE_BUILD_STRATEGIES[strategy]['table_sql'])
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        conn.executemany("INSERT INTO users (id, name) VALUES (?, ?);", batch)
+    conn.commit()
+
+
+def index_unique_table(conn, strategy):
+    # Построение уникального индекса после загрузки, если способ этого требует
+    settings = UNIQUE_BUILD_STRATEGIES[strategy]
+    if settings['index_sql'] is None:
+        return
+    cache_size = conn.execute('PRAGMA cache_size;').fetchone()[0]
+    if settings['cache_size'] is not None:
+        conn.execute(f"PRAGMA cache_size = {settings['cache_size']};")
+    try:
+        conn.execute(settings['index_sql'])
+    finally:
+        conn.execute(f'PRAGMA cache_size = {cache_size};')
+    conn.commit()
+
+
+def build_unique_table(conn, strategy, rows, batch_size=10_000):
+    # Дубликат name дает IntegrityError при вставке или при построении индекса
+    load_unique_table(conn, strategy, rows, batch_size)
+    index_unique_table(conn, strategy)
+
+
+def unique_index_shapes(conn, table):
+    # Уникальность, частичность и столбцы индексов таблицы без имени и происхождения ('u' или 'c')
+    shapes = []
+    for name, unique, partial in conn.execute(
+            "SELECT name, \"unique\", partial FROM pragma_index_list(?);", (table,)):
+        columns = tuple(row[0] for row in conn.execute("SELECT name FROM pragma_index_info(?) ORDER BY seqno;", (name,)))
+        shapes.append((unique, partial, columns))
+    return sorted(shapes)
@@ -0,0 +1,582 @@
+import argparse
+import ast
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import time
+import traceback
+import types
+import unittest
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Время выполнения тестов с прошлых запусков, по нему балансируются шарды
+DEFAULT_TIMINGS_PATH = '.test_timings.json'
+# Оценка для тестов, которых ещё нет в файле таймингов
+DEFAULT_TEST_DURATION = 0.01
+# Кэш результатов: тест, прошедший с тем же исходным кодом и теми же версиями SQLite и Python, не перезапускается
+DEFAULT_CACHE_PATH = '.test_results_cache.json'
+# Фикстуры, код которых входит в ключ кэша вместе с кодом тестового метода
+CACHE_KEY_FIXTURES = ('setUp', 'tearDown', 'setUpClass', 'tearDownClass')
+
+
+class RecordingResult(unittest.TestResult):
+    # Результат, который сохраняет исход и время каждого теста в виде сериализуемых записей
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = {}
+        self._started = {}
+
+    def _record(self, test):
+        return self.records.setdefault(test.id(), {
+            'id': test.id(),
+            'outcome': 'success',
+            'duration': 0.0,
+            'statements': None,
+            'message': '',
+        })
+
+    def _set_outcome(self, test, outcome, message=''):
+        record = self._record(test)
+        # Первая ошибка или падение теста важнее последующих (например, ошибки в tearDown)
+        if record['outcome'] in ('success', 'expected_failure'):
+            record['outcome'] = outcome
+            record['message'] = message
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._record(test)
+        self._started[test.id()] = time.perf_counter()
+
+    def stopTest(self, test):
+        started = self._started.pop(test.id(), None)
+        record = self._record(test)
+        if started is not None:
+            record['duration'] = time.perf_counter() - started
+        # Количество операторов считает trace callback соединения, открытого в setUp
+        record['statements'] = getattr(test, 'statement_count', None)
+        super().stopTest(test)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._set_outcome(test, 'error', self._exc_info_to_string(err, test))
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._set_outcome(test, 'failure', self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._set_outcome(test, 'skipped', reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._set_outcome(test, 'expected_failure', self._exc_info_to_string(err, test))
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._set_outcome(test, 'unexpected_success')
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            outcome = 'failure' if issubclass(err[0], test.failureException) else 'error'
+            self._set_outcome(test, outcome, self._exc_info_to_string(err, subtest))
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def collect_tests(module_names):
+    loader = unittest.TestLoader()
+    tests = []
+    for module_name in module_names:
+        tests.extend(iter_tests(loader.loadTestsFromName(module_name)))
+    return tests
+
+
+def load_json(path):
+    try:
+        with open(path, encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_timings(path, timings, records, test_ids):
+    # Время сохраняется только для тестов из test_ids: записи об ошибках фикстур ('setUpClass (tests.TestX)')
+    # и о повторных определениях методов - не тесты, шардам их время не нужно
+    timings = dict(timings)
+    for record in records:
+        if record['id'] in test_ids and record['outcome'] not in ('skipped', 'cached'):
+            timings[record['id']] = record['duration']
+    with open(path, 'w', encoding='utf-8') as timings_file:
+        json.dump(timings, timings_file, indent=2, sort_keys=True)
+
+
+def is_local_module(module, root):
+    # Локальный модуль - файл из каталога тестового модуля, кроме установленных пакетов
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return False
+    path = os.path.abspath(path)
+    return path.startswith(root + os.sep) and 'site-packages' not in path
+
+
+def code_names(code):
+    # Глобальные имена и атрибуты, на которые ссылается код, вместе с вложенными функциями, классами и генераторами
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= code_names(constant)
+    return names
+
+
+def class_functions(owner):
+    # Методы класса, включая classmethod, staticmethod и property, для обхода их зависимостей
+    functions = []
+    for value in vars(owner).values():
+        if isinstance(value, (classmethod, staticmethod)):
+            value = value.__func__
+        elif isinstance(value, property):
+            value = value.fget
+        if isinstance(value, types.FunctionType):
+            functions.append(value)
+    return functions
+
+
+@functools.lru_cache(maxsize=None)
+def object_source(value):
+    try:
+        return inspect.getsource(value)
+    except (OSError, TypeError):
+        return ''
+
+
+def is_constant(value):
+    # Значение, repr которого однозначно описывает его содержимое: строки, числа и их коллекции
+    if value is None or isinstance(value, (str, bytes, int, float)):
+        return True
+    if isinstance(value, dict):
+        return all(is_constant(key) and is_constant(item) for key, item in value.items())
+    return isinstance(value, (tuple, list, frozenset)) and all(map(is_constant, value))
+
+
+def dependency_sources(test_class, functions):
+    # Исходный код функций и классов локальных модулей и значения констант (имена в верхнем регистре),
+    # на которые ссылаются functions, транзитивно. Имена ищутся в глобальных переменных функции,
+    # в импортированных ею локальных модулях (helpers.quote_identifier) и в тестовом классе
+    # (self.assertRowsEqual из примесей)
+    root = os.path.dirname(os.path.abspath(sys.modules[test_class.__module__].__file__))
+    sources = {}
+    seen = set()
+    pending = list(functions)
+
+    def add(value):
+        value = getattr(value, '__func__', value)
+        value = inspect.unwrap(value) if isinstance(value, types.FunctionType) else value
+        if isinstance(value, (types.FunctionType, type)) and value not in seen \
+                and is_local_module(sys.modules.get(value.__module__), root):
+            sources[f'{value.__module__}.{value.__qualname__}'] = object_source(value)
+            pending.append(value)
+
+    while pending:
+        value = pending.pop()
+        if value in seen:
+            continue
+        seen.add(value)
+        if isinstance(value, type):
+            for item in value.__bases__:
+                add(item)
+            pending.extend(class_functions(value))
+            continue
+        names = code_names(value.__code__)
+        namespaces = [value.__globals__]
+        namespaces.extend(vars(module) for module in map(value.__globals__.get, names)
+                          if isinstance(module, types.ModuleType) and is_local_module(module, root))
+        for name in sorted(names):
+            for namespace in namespaces:
+                if name not in namespace:
+                    continue
+                if name.isupper() and is_constant(namespace[name]):
+                    sources[f'{namespace["__name__"]}.{name}'] = repr(namespace[name])
+                else:
+                    add(namespace[name])
+            if isinstance(getattr(test_class, name, None), (types.FunctionType, types.MethodType)):
+                add(getattr(test_class, name))
+    return sources
+
+
+def cache_key(test):
+    # Хеш кода тестового метода и фикстур класса, вызываемых ими функций и классов локальных модулей,
+    # настроек класса и версий SQLite и Python. Правка другого теста того же модуля ключ не меняет.
+    # --force нужен только при изменениях окружения, которых нет в ключе
+    test_class = type(test)
+    functions = [getattr(test_class, test._testMethodName)]
+    parts = [sqlite3.sqlite_version, sys.version, object_source(functions[0])]
+    for fixture_name in CACHE_KEY_FIXTURES:
+        fixture = getattr(test_class, fixture_name)
+        fixture = getattr(fixture, '__func__', fixture)
+        parts.append(object_source(fixture))
+        if isinstance(fixture, types.FunctionType):
+            functions.append(fixture)
+    parts.extend(f'{name}\0{source}' for name, source in sorted(dependency_sources(test_class, functions).items()))
+    # Настройки (бэкенд, режим изоляции, базовая схема) меняют поведение унаследованных тестов подклассов
+    settings = {}
+    for owner in reversed(test_class.__mro__):
+        for name, value in vars(owner).items():
+            if not name.startswith('_') and isinstance(value, (str, int, float, tuple)):
+                settings[name] = value
+    parts.append(repr(sorted(settings.items())))
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def cached_record(test_id):
+    return {'id': test_id, 'outcome': 'cached', 'duration': 0.0, 'statements': None, 'message': ''}
+
+
+def select_tests(tests, cache):
+    # Тесты, которые нужно выполнить, и записи для тестов, прошедших с тем же ключом в прошлых запусках
+    keys = {test.id(): cache_key(test) for test in tests}
+    selected = [test.id() for test in tests if cache.get(test.id()) != keys[test.id()]]
+    cached = [cached_record(test.id()) for test in tests if cache.get(test.id()) == keys[test.id()]]
+    return selected, cached, keys
+
+
+def save_cache(path, cache, records, keys):
+    cache = dict(cache)
+    for record in records:
+        if record['outcome'] == 'success':
+            cache[record['id']] = keys[record['id']]
+        elif record['outcome'] != 'cached':
+            cache.pop(record['id'], None)
+    with open(path, 'w', encoding='utf-8') as cache_file:
+        json.dump(cache, cache_file, indent=2, sort_keys=True)
+
+
+def find_shadowed_tests(source, module_name):
+    # Повторное определение тестового метода в классе молча заменяет первое: первый тест не выполняется
+    # и не попадает ни в выборку, ни в кэш. Возвращает записи об ошибке для заменённых определений
+    records = []
+    for node in ast.walk(ast.parse(source)):
+        if not isinstance(node, ast.ClassDef):
+            continue
+        definitions = {}
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith('test'):
+                if item.name in definitions:
+                    test_id = f'{module_name}.{node.name}.{item.name}'
+                    records.append(error_record(
+                        f'{test_id}:{definitions[item.name]}',
+                        f'Определение {test_id} в строке {definitions[item.name]} '
+                        f'заменено определением в строке {item.lineno}',
+                    ))
+                definitions[item.name] = item.lineno
+    return records
+
+
+def split_into_shards(test_ids, timings, shard_count):
+    # Жадная балансировка: самые долгие тесты раскладываются первыми в наименее загруженный шард
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    by_duration = sorted(test_ids, key=lambda test_id: timings.get(test_id, DEFAULT_TEST_DURATION), reverse=True)
+    for test_id in by_duration:
+        shard_index = loads.index(min(loads))
+        shards[shard_index].append(test_id)
+        loads[shard_index] += timings.get(test_id, DEFAULT_TEST_DURATION)
+    # Внутри шарда сохраняем исходный порядок, чтобы тесты одного класса шли подряд
+    order = {test_id: position for position, test_id in enumerate(test_ids)}
+    return [sorted(shard, key=order.__getitem__) for shard in shards if shard]
+
+
+def error_record(test_id, message):
+    return {'id': test_id, 'outcome': 'error', 'duration': 0.0, 'statements': None, 'message': message}
+
+
+def run_shard(test_ids):
+    result = RecordingResult()
+    try:
+        unittest.TestLoader().loadTestsFromNames(test_ids).run(result)
+    except Exception:
+        # Ошибка вне теста (например, при импорте) не должна терять результаты всего шарда
+        message = traceback.format_exc()
+        for test_id in test_ids:
+            result.records.setdefault(test_id, error_record(test_id, message))
+    # Все записи, включая ошибки фикстур с идентификаторами вида 'setUpClass (tests.TestX)':
+    # тесты класса с упавшей фикстурой не выполняются, и без этой записи они пропали бы из отчёта
+    return list(result.records.values())
+
+
+def run_sharded(test_ids, timings, workers):
+    shards = split_into_shards(test_ids, timings, workers)
+    if len(shards) <= 1:
+        records = run_shard(test_ids)
+    else:
+        records = []
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [(shard, executor.submit(run_shard, shard)) for shard in shards]
+            for shard, future in futures:
+                try:
+                    records.extend(future.result())
+                except BrokenProcessPool:
+                    # Процесс завершился аварийно (например, os._exit или сбой в расширении): тесты шарда - ошибки
+                    message = traceback.format_exc()
+                    records.extend(error_record(test_id, message) for test_id in shard)
+    order = {test_id: position for position, test_id in enumerate(test_ids)}
+    return sorted(records, key=lambda record: order.get(record['id'], len(order)))
+
+
+def runs_concurrently(test_class):
+    # Класс сам сообщает, что его тесты независимы друг от друга и могут выполняться в разных потоках
+    runs_tests_concurrently = getattr(test_class, 'runs_tests_concurrently', None)
+    return runs_tests_concurrently is not None and runs_tests_concurrently()
+
+
+def run_cleanups(owner, fixture_name, description):
+    # addClassCleanup/addModuleCleanup; ошибки записываются, как в unittest, под именем фикстуры
+    test_id = f'{fixture_name} ({description})'
+    if isinstance(owner, type):
+        owner.doClassCleanups()
+        return [error_record(test_id, ''.join(traceback.format_exception(*exc_info)))
+                for exc_info in owner.tearDown_exceptions]
+    try:
+        unittest.case.doModuleCleanups()
+    except Exception:
+        return [error_record(test_id, traceback.format_exc())]
+    return []
+
+
+def run_fixture(owner, fixture_name, description):
+    # setUpModule/setUpClass и парные им; ошибка записывается как в unittest: 'setUpClass (tests.TestX)'
+    if getattr(owner, '__unittest_skip__', False):
+        return []
+    records = []
+    fixture = getattr(owner, fixture_name, None)
+    if fixture is not None:
+        try:
+            fixture()
+        except Exception:
+            records.append(error_record(f'{fixture_name} ({description})', traceback.format_exc()))
+    # После упавшей setUp-фикстуры парная tearDown не вызывается, поэтому очистки выполняются сразу
+    if records or fixture_name.startswith('tearDown'):
+        records.extend(run_cleanups(owner, fixture_name, description))
+    return records
+
+
+def run_test(test):
+    result = RecordingResult()
+    test.run(result)
+    return list(result.records.values())
+
+
+def run_class(test_class, tests):
+    # Фикстуры класса и все его тесты в одном потоке: соединение класса нельзя использовать из других потоков
+    class_name = f'{test_class.__module__}.{test_class.__qualname__}'
+    records = run_fixture(test_class, 'setUpClass', class_name)
+    if records:
+        return records
+    for test in tests:
+        records.extend(run_test(test))
+    return records + run_fixture(test_class, 'tearDownClass', class_name)
+
+
+async def run_tests_async(tests, concurrency):
+    # Каждый тест - корутина, которая выполняет его в ограниченном пуле потоков.
+    # sqlite3 отпускает GIL на время выполнения операторов, поэтому ожидания fsync в commit() разных тестов перекрываются
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    groups = {}
+    for test in tests:
+        groups.setdefault(type(test), []).append(test)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def in_thread(function, *args):
+            async with semaphore:
+                return await loop.run_in_executor(executor, function, *args)
+
+        async def run_concurrent_class(test_class, class_tests):
+            class_name = f'{test_class.__module__}.{test_class.__qualname__}'
+            records = await in_thread(run_fixture, test_class, 'setUpClass', class_name)
+            if records:
+                return records
+            for test_records in await asyncio.gather(*(in_thread(run_test, test) for test in class_tests)):
+                records.extend(test_records)
+            return records + await in_thread(run_fixture, test_class, 'tearDownClass', class_name)
+
+        records = []
+        for class_records in await asyncio.gather(*(
+                run_concurrent_class(test_class, class_tests)
+                for test_class, class_tests in groups.items() if runs_concurrently(test_class))):
+            records.extend(class_records)
+        # Остальные классы могут разделять состояние (соединение класса, общие списки), поэтому идут по одному
+        for test_class, class_tests in groups.items():
+            if not runs_concurrently(test_class):
+                records.extend(await in_thread(run_class, test_class, class_tests))
+    return records
+
+
+def run_concurrent(test_ids, concurrency):
+    # Облегчённая альтернатива шардированию по процессам для тестов с файловыми базами
+    try:
+        tests = list(iter_tests(unittest.TestLoader().loadTestsFromNames(test_ids)))
+    except Exception:
+        message = traceback.format_exc()
+        return [error_record(test_id, message) for test_id in test_ids]
+    modules = list(dict.fromkeys(sys.modules[type(test).__module__] for test in tests))
+    records = []
+    for module in modules:
+        records.extend(run_fixture(module, 'setUpModule', module.__name__))
+    if not records:
+        records.extend(asyncio.run(run_tests_async(tests, concurrency)))
+    for module in modules:
+        records.extend(run_fixture(module, 'tearDownModule', module.__name__))
+    order = {test_id: position for position, test_id in enumerate(test_ids)}
+    return sorted(records, key=lambda record: order.get(record['id'], len(order)))
+
+
+def count_outcomes(records):
+    counts = {}
+    for record in records:
+        counts[record['outcome']] = counts.get(record['outcome'], 0) + 1
+    return counts
+
+
+def print_summary(records, elapsed, stream=sys.stderr):
+    # Сводка в формате unittest.TextTestRunner
+    separator = '=' * 70
+    for outcome, label in (('error', 'ERROR'), ('failure', 'FAIL')):
+        for record in records:
+            if record['outcome'] == outcome:
+                stream.write(f"{separator}\n{label}: {record['id']}\n{'-' * 70}\n{record['message']}\n")
+    stream.write(f"{'-' * 70}\nRan {len(records)} test{'s' if len(records) != 1 else ''} in {elapsed:.3f}s\n\n")
+
+    counts = count_outcomes(records)
+    details = []
+    for outcome, label in (('failure', 'failures'), ('error', 'errors'), ('skipped', 'skipped'), ('cached', 'cached'),
+                           ('expected_failure', 'expected failures'),
+                           ('unexpected_success', 'unexpected successes')):
+        if counts.get(outcome):
+            details.append(f'{label}={counts[outcome]}')
+    status = 'FAILED' if counts.get('failure') or counts.get('error') or counts.get('unexpected_success') else 'OK'
+    stream.write(status + (f" ({', '.join(details)})" if details else '') + '\n')
+    return status == 'OK'
+
+
+def format_slowest(records, top):
+    # Таблица самых медленных тестов: время, количество SQL-операторов, идентификатор теста
+    slowest = sorted(records, key=lambda record: record['duration'], reverse=True)[:top]
+    lines = [f'Slowest {len(slowest)} tests:', f"{'seconds':>10} {'statements':>10}  test"]
+    for record in slowest:
+        statements = '-' if record['statements'] is None else record['statements']
+        lines.append(f"{record['duration']:>10.4f} {statements:>10}  {record['id']}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_report_json(path, records, elapsed):
+    report = {
+        'elapsed': elapsed,
+        'tests': sorted(
+            ({key: record[key] for key in ('id', 'outcome', 'duration', 'statements')} for record in records),
+            key=lambda record: record['duration'],
+            reverse=True,
+        ),
+    }
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+def write_junit_xml(path, records, elapsed):
+    counts = count_outcomes(records)
+    testsuite = ET.Element('testsuite', {
+        'name': 'tests',
+        'tests': str(len(records)),
+        'failures': str(counts.get('failure', 0) + counts.get('unexpected_success', 0)),
+        'errors': str(counts.get('error', 0)),
+        'skipped': str(counts.get('skipped', 0) + counts.get('cached', 0)),
+        'time': f'{elapsed:.3f}',
+    })
+    for record in records:
+        class_name, _, test_name = record['id'].rpartition('.')
+        testcase = ET.SubElement(testsuite, 'testcase', {
+            'classname': class_name,
+            'name': test_name,
+            'time': f"{record['duration']:.6f}",
+        })
+        if record['outcome'] == 'failure':
+            ET.SubElement(testcase, 'failure', {'message': 'failure'}).text = record['message']
+        elif record['outcome'] == 'unexpected_success':
+            ET.SubElement(testcase, 'failure', {'message': 'unexpected success'})
+        elif record['outcome'] == 'error':
+            ET.SubElement(testcase, 'error', {'message': 'error'}).text = record['message']
+        elif record['outcome'] == 'skipped':
+            ET.SubElement(testcase, 'skipped', {'message': record['message']})
+        elif record['outcome'] == 'cached':
+            ET.SubElement(testcase, 'skipped', {'message': 'passed in a previous run with the same cache key'})
+    ET.ElementTree(testsuite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Параллельный запуск тестов с шардированием по процессам')
+    parser.add_argument('modules', nargs='*', default=['tests'],
+                        help='модули или тестовые классы для запуска (по умолчанию tests)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='количество процессов')
+    parser.add_argument('--concurrency', type=int, default=0, metavar='N',
+                        help='выполнять тесты в одном процессе через asyncio и пул из N потоков вместо процессов')
+    parser.add_argument('--timings', default=DEFAULT_TIMINGS_PATH,
+                        help='файл с временем выполнения тестов для балансировки шардов')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='файл с ключами прошедших тестов, которые не нужно перезапускать')
+    parser.add_argument('--force', action='store_true',
+                        help='выполнить все тесты, не пропуская закэшированные, и обновить кэш')
+    parser.add_argument('--junit-xml', help='путь для отчёта в формате JUnit XML')
+    parser.add_argument('--slowest', type=int, default=0, metavar='N',
+                        help='вывести N самых медленных тестов с количеством SQL-операторов')
+    parser.add_argument('--report-json', help='путь для отчёта о времени и операторах каждого теста')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    tests = collect_tests(args.modules)
+    timings = load_json(args.timings)
+    cache = load_json(args.cache)
+    test_ids, records, keys = select_tests(tests, {} if args.force else cache)
+    for module in dict.fromkeys(sys.modules[type(test).__module__] for test in tests):
+        records.extend(find_shadowed_tests(inspect.getsource(module), module.__name__))
+
+    started = time.perf_counter()
+    if args.concurrency > 0:
+        records.extend(run_concurrent(test_ids, args.concurrency))
+    else:
+        records.extend(run_sharded(test_ids, timings, max(args.workers, 1)))
+    elapsed = time.perf_counter() - started
+    order = {test.id(): position for position, test in enumerate(tests)}
+    records.sort(key=lambda record: order.get(record['id'], len(order)))
+
+    save_timings(args.timings, timings, records, order)
+    save_cache(args.cache, cache, records, keys)
+    if args.junit_xml:
+        write_junit_xml(args.junit_xml, records, elapsed)
+    if args.report_json:
+        write_report_json(args.report_json, records, elapsed)
+    if args.slowest:
+        sys.stderr.write(format_slowest(records, args.slowest) + '\n')
+    return 0 if print_summary(records, elapsed) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
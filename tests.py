@@ -1,14 +1,289 @@
+import asyncio
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 import sqlite3
+import xml.etree.ElementTree as ET
+
+import benchmarks
+import clone
+import fuzz
+import runner
+from helpers import (
+    CHILD_INDEXES_SQL, CTAS_FILL_SQL, CTAS_SOURCE_SQL, FOREIGN_KEY_SCHEMA_SQL, INDEX_VARIANTS, INDEXED_TABLE_SQL,
+    MAX_ROWID, PRIMARY_KEY_VARIANTS, TABLE_VARIANTS, UNIQUE_BUILD_STRATEGIES, VARIANT_SCHEMAS, SchemaInspector,
+    build_unique_table, catalog_object_exists, ctas_source_rows, execute_script, expected_fingerprint,
+    expected_variant_columns, fetch_table_schema, first_difference, iter_fetchmany, iter_statements, query_plan,
+    row_hash, table_fingerprint, table_variant_sql, unindexed_foreign_keys, unique_index_shapes, uses_index,
+)
+
+
+# Шаблонные базы, собранные один раз на сессию: ключ - текст DDL базовой схемы
+_template_databases = {}
+_template_databases_lock = threading.Lock()
+
+
+def get_template_database(base_schema):
+    # Возвращает in-memory базу с уже выполненной схемой, собирая её только при первом обращении
+    # Шаблон копируется через backup() из потоков runner.py --concurrency
+    with _template_databases_lock:
+        template = _template_databases.get(base_schema)
+        if template is None:
+            template = sqlite3.connect(':memory:', check_same_thread=False)
+            template.executescript(base_schema)
+            template.commit()
+            _template_databases[base_schema] = template
+    return template
+
+
+def tearDownModule():
+    for template in _template_databases.values():
+        template.close()
+    _template_databases.clear()
+
+
+# Бэкенды хранения: None - база в памяти, иначе PRAGMA для файла во временном каталоге
+BACKENDS = {
+    'memory': None,
+    'file_rollback_journal': ('PRAGMA journal_mode = DELETE;', 'PRAGMA synchronous = FULL;'),
+    'file_wal': ('PRAGMA journal_mode = WAL;', 'PRAGMA synchronous = FULL;'),
+    'file_wal_synchronous_normal': ('PRAGMA journal_mode = WAL;', 'PRAGMA synchronous = NORMAL;'),
+    'file_wal_synchronous_off': ('PRAGMA journal_mode = WAL;', 'PRAGMA synchronous = OFF;'),
+}
+
+
+class TimedConnection(sqlite3.Connection):
+    # Соединение, которое считает количество и суммарное время commit()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commit_count = 0
+        self.commit_seconds = 0.0
+
+    def commit(self):
+        started = time.perf_counter()
+        super().commit()
+        self.commit_seconds += time.perf_counter() - started
+        self.commit_count += 1
+
+
+def connect_backend(backend, path, **kwargs):
+    pragmas = BACKENDS[backend]
+    conn = sqlite3.connect(':memory:' if pragmas is None else path, **kwargs)
+    for pragma in pragmas or ():
+        conn.execute(pragma)
+    return conn
+
+
+class SavepointConnection(TimedConnection):
+    # Соединение, в котором тест выполняется внутри SAVEPOINT.
+    # commit() внутри теста не завершает транзакцию, а rollback() откатывает только до точки сохранения
+    savepoint_name = 'test_case'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_test_savepoint = False
+
+    def begin_test(self):
+        self.execute(f'SAVEPOINT {self.savepoint_name};')
+        self.in_test_savepoint = True
+
+    def rollback_test(self):
+        self.in_test_savepoint = False
+        if not self.in_transaction:
+            raise AssertionError(
+                'Транзакция теста была завершена до tearDown (например, executescript выполняет COMMIT)'
+            )
+        self.execute(f'ROLLBACK TO {self.savepoint_name};')
+        self.execute(f'RELEASE {self.savepoint_name};')
+
+    def commit(self):
+        if not self.in_test_savepoint:
+            super().commit()
+
+    def rollback(self):
+        if self.in_test_savepoint:
+            self.execute(f'ROLLBACK TO {self.savepoint_name};')
+        else:
+            super().rollback()
+
+
+def read_schema(conn):
+    return conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name;").fetchall()
+
+
+# Размер копируемой таблицы в тестах; миллионы строк - в benchmarks.py ctas
+CTAS_TEST_ROW_COUNT = 20_000
+
+
+class SchemaAssertionsMixin:
+    # Полный diff схемы при падении
+    maxDiff = None
+
+    def assertTableSchema(self, conn, table, columns=None, foreign_keys=None, indexes=None):
+        # Проверка существования таблицы и переданных частей её схемы одной структурой
+        schema = fetch_table_schema(conn, table)
+        if schema is None:
+            self.fail(f'Таблица {table!r} не найдена в sqlite_master')
+        expected = {'columns': columns, 'foreign_keys': foreign_keys, 'indexes': indexes}
+        expected = {part: list(value) for part, value in expected.items() if value is not None}
+        actual = {part: schema[part] for part in expected}
+        self.assertEqual(actual, expected, f'Схема таблицы {table!r} отличается от ожидаемой')
+
+    def assertTableExists(self, conn, table):
+        if not catalog_object_exists(conn, 'table', table):
+            self.fail(f'Таблица {table!r} не найдена в sqlite_master')
+
+    def assertIndexExists(self, conn, index):
+        if not catalog_object_exists(conn, 'index', index):
+            self.fail(f'Индекс {index!r} не найден в sqlite_master')
+
+    def assertRowsEqual(self, cursor, expected_rows):
+        # Потоковое сравнение результата курсора с ожидаемыми строками порциями cursor.arraysize.
+        # Ни одна из сторон не материализуется целиком, проверка останавливается на первом расхождении
+        difference = first_difference(iter_fetchmany(cursor), map(tuple, expected_rows))
+        if difference is None:
+            return
+        index, actual, expected = difference
+        if actual is None:
+            self.fail(f'Результат закончился на строке {index}, ожидалась строка {expected!r}')
+        if expected is None:
+            self.fail(f'Лишняя строка {index} в результате: {actual!r}')
+        self.fail(f'Строка {index} отличается: {actual!r} != {expected!r}')
+
+    def assertTableFingerprint(self, conn, table, expected):
+        # Сравнение отпечатков вместо передачи строк в Python; expected - результат expected_fingerprint
+        # или table_fingerprint другой таблицы. Суммы с плавающей точкой сравниваются с относительной погрешностью
+        actual = table_fingerprint(conn, table, tuple(expected['totals']))
+        self.assertEqual(actual['count'], expected['count'], f'Количество строк в {table!r} отличается')
+        for column, total in expected['totals'].items():
+            if not math.isclose(actual['totals'][column], total, rel_tol=1e-12):
+                self.fail(f'total({column}) в {table!r} отличается: {actual["totals"][column]!r} != {total!r}')
+        self.assertEqual(actual['row_hash'], expected['row_hash'], f'Хеш строк {table!r} отличается')
+
+    def assertForeignKeysIndexed(self, conn):
+        missing = unindexed_foreign_keys(conn)
+        if missing:
+            self.fail(f'Внешние ключи без индекса по дочерним столбцам (table, columns, parent): {missing}')
+
+    def assertUsesIndex(self, conn, sql, index_name, parameters=()):
+        # Проверка через EXPLAIN QUERY PLAN, что запрос использует индекс
+        plan = query_plan(conn, sql, parameters)
+        if not uses_index(plan, index_name):
+            self.fail(f'Запрос не использует индекс {index_name!r}: {sql}\nПлан: {plan}')
+
+
+# Родительские таблицы для внешних ключей в базовой схеме основного набора тестов
+PARENT_TABLES_SQL = """
+CREATE TABLE authors (
+    author_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE publishers (
+    publisher_id INTEGER PRIMARY KEY
+);
+"""
+
+
+class TemplateDatabaseMixin:
+    # Базовая схема, общая для всех тестов класса. Она выполняется один раз,
+    # а каждый тест получает свою копию через Connection.backup()
+    base_schema = ''
+    # 'connection' - новое соединение на каждый тест,
+    # 'savepoint' - одно соединение на класс, каждый тест откатывается до SAVEPOINT в tearDown
+    isolation = 'connection'
+    # Ключ из BACKENDS: база в памяти или файл с выбранным журналом и synchronous
+    backend = 'memory'
+    # PRAGMA foreign_keys = ON для соединений теста
+    foreign_keys = False
+    # Размер кэша подготовленных операторов соединения теста (значение по умолчанию sqlite3)
+    cached_statements = 128
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if cls.backend not in BACKENDS:
+            raise ValueError(f'Неизвестный бэкенд: {cls.backend!r}')
+        cls.database_directory = tempfile.mkdtemp() if BACKENDS[cls.backend] else None
+        cls.template_conn = get_template_database(cls.base_schema) if cls.base_schema else None
+        if cls.isolation == 'savepoint':
+            cls.class_conn = cls.connect('class', isolation_level=None, factory=SavepointConnection,
+                                         cached_statements=cls.cached_statements)
+            cls.class_schema = read_schema(cls.class_conn)
+        elif cls.isolation != 'connection':
+            raise ValueError(f'Неизвестный режим изоляции: {cls.isolation!r}')
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.isolation == 'savepoint':
+            cls.class_conn.close()
+        if cls.database_directory is not None:
+            shutil.rmtree(cls.database_directory, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def connect(cls, name, **kwargs):
+        path = os.path.join(cls.database_directory, f'{name}.db') if cls.database_directory else None
+        conn = connect_backend(cls.backend, path, **kwargs)
+        if cls.template_conn is not None:
+            cls.template_conn.backup(conn)
+        if cls.foreign_keys:
+            conn.execute('PRAGMA foreign_keys = ON;')
+        return conn
+
+    @classmethod
+    def runs_tests_concurrently(cls):
+        # У каждого теста своё соединение и свой файл базы, поэтому runner.py --concurrency
+        # выполняет их в разных потоках; в режиме savepoint все тесты класса работают через одно соединение
+        return cls.isolation == 'connection'
 
-
-class TestCreateTableSQL(unittest.TestCase):
     def setUp(self):
-        self.conn = sqlite3.connect(':memory:')
+        if self.isolation == 'savepoint':
+            self.conn = self.class_conn
+            self.conn.begin_test()
+        else:
+            self.conn = self.connect(self._testMethodName, factory=TimedConnection,
+                                     cached_statements=self.cached_statements)
         self.cursor = self.conn.cursor()
+        # Счётчик SQL-операторов теста, его читает отчёт runner.py
+        self.statement_count = 0
+        self.conn.set_trace_callback(self._count_statement)
+        self.commits_before_test = (self.conn.commit_count, self.conn.commit_seconds)
+        self.test_started = time.perf_counter()
+
+    def _count_statement(self, statement):
+        self.statement_count += 1
 
     def tearDown(self):
-        self.conn.close()
+        self.conn.set_trace_callback(None)
+        # Время теста и его commit(); собирает только бенчмарк backends через свой TestResult
+        self.backend_timing = {
+            'backend': self.backend,
+            'isolation': self.isolation,
+            'test': self.id(),
+            'seconds': time.perf_counter() - self.test_started,
+            'statements': self.statement_count,
+            'commits': self.conn.commit_count - self.commits_before_test[0],
+            'commit_seconds': self.conn.commit_seconds - self.commits_before_test[1],
+        }
+        if self.isolation == 'savepoint':
+            self.cursor.close()
+            self.conn.rollback_test()
+            # Проверка, что созданные тестом таблицы и индексы откатились
+            self.assertEqual(read_schema(self.conn), self.class_schema)
+        else:
+            self.conn.close()
+
+
+class TestCreateTableSQL(TemplateDatabaseMixin, SchemaAssertionsMixin, unittest.TestCase):
+    # Родительские таблицы для внешних ключей создаются один раз в шаблоне и копируются в каждый тест
+    base_schema = PARENT_TABLES_SQL
 
     def test_create_table_success_with_primary_key(self):
         # Позитивный тест на создание таблицы c названием на английском с PRIMARY KEY
@@ -21,16 +296,6 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        # Проверка существования таблицы
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cities';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'cities')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(cities);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
@@ -38,12 +303,8 @@ class TestCreateTableSQL(unittest.TestCase):
             (2, 'location', 'POINT', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'cities', columns=expected_columns)
 
     def test_create_table_with_copy_scructure(self):
         # Позитивный тест на создание таблицы с помощью копирования структуры у другой через select
@@ -63,19 +324,9 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_copy_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cities';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'cities')
-
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='local_cities';")
-        copy_table = self.cursor.fetchone()
-        self.assertIsNotNone(copy_table)
-        self.assertEqual(copy_table[0], 'local_cities')
+        self.assertTableExists(self.conn, 'cities')
 
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(cities);")
-        columns = self.cursor.fetchall()
+        self.assertTableExists(self.conn, 'local_cities')
 
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
@@ -84,12 +335,15 @@ class TestCreateTableSQL(unittest.TestCase):
             (2, 'location', 'POINT', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'cities', columns=expected_columns)
 
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Копия получает только имена столбцов и типы по их affinity, PRIMARY KEY теряется
+        self.assertTableSchema(self.conn, 'local_cities', columns=[
+            (0, 'id', 'INT', 0, None, 0),
+            (1, 'name', 'TEXT', 0, None, 0),
+            (2, 'location', 'INT', 0, None, 0)
+        ])
 
     def test_create_table_using_copy_with_data(self):
         # Позитивный тест на создание таблицы с помощью копирования части данных у другой через select
@@ -109,14 +363,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_copy_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='british_cities';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'british_cities')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(cities);")
-        columns = self.cursor.fetchall()
+        self.assertTableExists(self.conn, 'british_cities')
 
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
@@ -124,24 +371,48 @@ class TestCreateTableSQL(unittest.TestCase):
             (1, 'name', 'VARCHAR(80)', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'cities', columns=expected_columns)
 
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка скопированных данных: только строка с id = 2
+        self.assertRowsEqual(self.cursor.execute("SELECT * FROM british_cities;"), [(2, 'London')])
 
-        # Проверка существующих данных
-        self.cursor.execute("SELECT * FROM british_cities;")
-        user = self.cursor.fetchone()
+    def test_create_table_as_select_drops_constraints(self):
+        # Позитивный тест на то, какие ограничения теряет CREATE TABLE ... AS SELECT
+        execute_script(self.conn, CTAS_SOURCE_SQL)
+        self.cursor.execute("CREATE TABLE copied_cities AS SELECT * FROM source_cities;")
+        self.conn.commit()
 
-        # Ожидаемые значения
-        expected_user = (2, 'London')
+        # Остаются имена столбцов и affinity типа: VARCHAR(80) - TEXT, а POINT содержит 'INT' и получает INT.
+        # PRIMARY KEY, NOT NULL, DEFAULT, UNIQUE, CHECK, внешний ключ и индексы теряются
+        self.assertTableSchema(self.conn, 'copied_cities', columns=[
+            (0, 'id', 'INT', 0, None, 0),
+            (1, 'name', 'TEXT', 0, None, 0),
+            (2, 'population', 'INT', 0, None, 0),
+            (3, 'code', 'TEXT', 0, None, 0),
+            (4, 'location', 'INT', 0, None, 0),
+            (5, 'country_id', 'INT', 0, None, 0)
+        ], foreign_keys=[], indexes=[])
+
+        # Строки, которые нарушили бы каждое из ограничений исходной таблицы, вставляются без ошибок
+        violating_rows = [(1, 'Moscow', 1, 'C1', 0, 1), (1, None, -1, 'C1', 0, 999)]
+        self.cursor.executemany("INSERT INTO copied_cities VALUES (?, ?, ?, ?, ?, ?);", violating_rows)
+        self.assertEqual(self.conn.execute("SELECT count(*) FROM copied_cities WHERE id = 1;").fetchone()[0], 2)
+        # Столбец id больше не псевдоним rowid
+        self.cursor.execute("INSERT INTO copied_cities (name) VALUES ('Kazan');")
+        self.assertIsNone(self.conn.execute("SELECT id FROM copied_cities WHERE name = 'Kazan';").fetchone()[0])
+
+    def test_create_table_as_select_copies_large_table(self):
+        # Позитивный тест на копирование большой таблицы с проверкой данных по отпечатку
+        execute_script(self.conn, CTAS_SOURCE_SQL)
+        self.cursor.execute(CTAS_FILL_SQL, (CTAS_TEST_ROW_COUNT,))
+        self.cursor.execute("CREATE TABLE copied_cities AS SELECT * FROM source_cities;")
+        self.conn.commit()
 
-        # Проверка данных
-        self.assertIsNotNone(user)
-        self.assertEqual(user[0], expected_user[0])  # id
-        self.assertEqual(user[1], expected_user[1])  # name
+        # Отпечаток копии вычисляется внутри SQLite и сравнивается с ожидаемым по строкам генератора
+        columns = ('id', 'name', 'population', 'code', 'location', 'country_id')
+        expected = expected_fingerprint(ctas_source_rows(CTAS_TEST_ROW_COUNT), columns, ('id', 'population', 'location'))
+        self.assertTableFingerprint(self.conn, 'copied_cities', expected)
 
     def test_create_table_success_without_primary_key(self):
         # Позитивный тест на создание таблицы c названием на английском без PRIMARY KEY
@@ -155,15 +426,6 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cities';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'cities')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(cities);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 0),
@@ -171,12 +433,8 @@ class TestCreateTableSQL(unittest.TestCase):
             (2, 'location', 'POINT', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'cities', columns=expected_columns)
 
     def test_create_table_with_foreign_key_success(self):
         # Позитивный тест на создание таблицы с внешним ключом
@@ -200,19 +458,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_employee_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cities';")
-        city_table = self.cursor.fetchone()
-        self.assertIsNotNone(city_table)
-        self.assertEqual(city_table[0], 'cities')
-
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees';")
-        employee_table = self.cursor.fetchone()
-        self.assertIsNotNone(employee_table)
-        self.assertEqual(employee_table[0], 'employees')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(employees);")
-        columns = self.cursor.fetchall()
+        self.assertTableExists(self.conn, 'cities')
 
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
@@ -222,12 +468,12 @@ class TestCreateTableSQL(unittest.TestCase):
             (3, 'city_id', 'INTEGER', 0, None, 0),
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(
+            self.conn, 'employees',
+            columns=expected_columns,
+            foreign_keys=[(0, 0, 'cities', 'city_id', 'id')],
+        )
 
     def test_create_table_with_not_null(self):
         # Позитивный тест на создание таблицы со всеми столбцами NOT NULL
@@ -242,15 +488,6 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'employees')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(employees);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
@@ -259,12 +496,12 @@ class TestCreateTableSQL(unittest.TestCase):
             (3, 'city_id', 'INTEGER', 1, None, 0),
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(
+            self.conn, 'employees',
+            columns=expected_columns,
+            foreign_keys=[(0, 0, 'cities', 'city_id', 'id')],
+        )
 
     def test_create_table_with_unique(self):
         # Позитивный тест на создание таблицы со столбцом UNIQUE
@@ -277,26 +514,37 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(users);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'name', 'VARCHAR(80)', 1, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(
+            self.conn, 'users',
+            columns=expected_columns,
+            indexes=[('sqlite_autoindex_users_1', 1, 'u', 0)],
+        )
+
+    def test_unique_build_strategies_are_equivalent(self):
+        # Позитивный и негативный тесты на одинаковый результат трёх способов построения уникального индекса:
+        # индекс той же формы, одно и то же сообщение о дубликате при загрузке и после неё
+        rows = [(1, 'Anna'), (2, 'Boris'), (3, 'Vera')]
+        for strategy in UNIQUE_BUILD_STRATEGIES:
+            with self.subTest(strategy=strategy):
+                build_unique_table(self.conn, strategy, rows)
+                self.assertEqual(unique_index_shapes(self.conn, 'users'), [(1, 0, ('name',))])
+                with self.assertRaisesRegex(sqlite3.IntegrityError, r'^UNIQUE constraint failed: users\.name$'):
+                    self.cursor.execute("INSERT INTO users (id, name) VALUES (4, 'Anna');")
+                self.cursor.execute("DROP TABLE users;")
+
+                with self.assertRaisesRegex(sqlite3.IntegrityError, r'^UNIQUE constraint failed: users\.name$'):
+                    build_unique_table(self.conn, strategy, rows + [(4, 'Anna')])
+                self.conn.rollback()
+                # CREATE TABLE вне явной транзакции уже зафиксирован, в режиме savepoint откатывается вместе с данными
+                self.cursor.execute("DROP TABLE IF EXISTS users;")
+                self.conn.commit()
 
     def test_create_table_with_russian_name(self):
         # Позитивный тест на создание таблицы с русским названием
@@ -309,9 +557,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='пользователи';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
+        self.assertTableExists(self.conn, 'пользователи')
 
     def test_create_table_with_quotation_name(self):
         # Позитивный тест на создание таблицы в один кавычках
@@ -324,9 +570,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='пользователи';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
+        self.assertTableExists(self.conn, 'пользователи')
 
     def test_create_table_with_empty_name(self):
         # Позитивный тест на создание таблицы c пустым названием ''
@@ -339,9 +583,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
+        self.assertTableExists(self.conn, '')
 
     def test_create_table_with_symbols(self):
         # Позитивный тест на создание таблицы с числами и спец символами
@@ -354,9 +596,7 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cities_23_$';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
+        self.assertTableExists(self.conn, 'cities_23_$')
 
 
     def test_create_table_with_name_in_one_symbol(self):
@@ -370,26 +610,14 @@ class TestCreateTableSQL(unittest.TestCase):
         self.cursor.execute(create_table_sql)
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='U';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(U);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'name', 'VARCHAR(80)', 1, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'U', columns=expected_columns)
 
     def test_create_table_with_check_constraint(self):
         # Создание таблицы с `CHECK` ограничением
@@ -401,27 +629,14 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='products';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'products')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(products);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'price', 'REAL', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'products', columns=expected_columns)
 
     def test_create_table_with_autoincrement(self):
         # Создание таблицы с автоинкрементным столбцом
@@ -433,28 +648,64 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='products';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'products')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(products);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'price', 'REAL', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'products', columns=expected_columns)
+
+        # Первая таблица с AUTOINCREMENT создаёт sqlite_sequence, строка для таблицы появляется при первой вставке
+        self.assertTableExists(self.conn, 'sqlite_sequence')
+        self.assertRowsEqual(self.cursor.execute("SELECT name, seq FROM sqlite_sequence;"), [])
 
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+    def test_autoincrement_does_not_reuse_ids(self):
+        # Позитивный тест на sqlite_sequence и на то, что id удалённых строк не выдаются повторно
+        self.cursor.execute(PRIMARY_KEY_VARIANTS['autoincrement'])
+        self.cursor.executemany("INSERT INTO products (price) VALUES (?);", [(1.0,), (2.0,), (3.0,)])
+        self.assertRowsEqual(self.cursor.execute("SELECT name, seq FROM sqlite_sequence;"), [('products', 3)])
 
+        self.cursor.execute("DELETE FROM products WHERE id = 3;")
+        self.cursor.execute("INSERT INTO products (price) VALUES (4.0);")
+        self.cursor.execute("DELETE FROM products;")
+        self.cursor.execute("INSERT INTO products (price) VALUES (5.0);")
+        self.assertRowsEqual(self.cursor.execute("SELECT id, price FROM products;"), [(5, 5.0)])
+
+        # Явно заданный id больше текущего значения сдвигает последовательность
+        self.cursor.execute("INSERT INTO products (id, price) VALUES (100, 6.0);")
+        self.cursor.execute("INSERT INTO products (price) VALUES (7.0);")
+        self.conn.commit()
+        self.assertRowsEqual(self.cursor.execute("SELECT id FROM products ORDER BY id;"), [(5,), (100,), (101,)])
+        self.assertRowsEqual(self.cursor.execute("SELECT name, seq FROM sqlite_sequence;"), [('products', 101)])
+
+    def test_integer_primary_key_reuses_ids(self):
+        # Позитивный тест на то, что без AUTOINCREMENT id удалённой последней строки выдаётся снова
+        self.cursor.execute(PRIMARY_KEY_VARIANTS['integer_primary_key'])
+        self.cursor.executemany("INSERT INTO products (price) VALUES (?);", [(1.0,), (2.0,), (3.0,)])
+        self.cursor.execute("DELETE FROM products WHERE id = 3;")
+        self.cursor.execute("INSERT INTO products (price) VALUES (4.0);")
+        self.conn.commit()
+        self.assertRowsEqual(self.cursor.execute("SELECT id, price FROM products ORDER BY id;"),
+                             [(1, 1.0), (2, 2.0), (3, 4.0)])
+        self.assertFalse(catalog_object_exists(self.conn, 'table', 'sqlite_sequence'))
+
+    def test_autoincrement_fails_after_max_rowid(self):
+        # Негативный тест на исчерпание id: AUTOINCREMENT даёт SQLITE_FULL, обычный ключ берёт свободный id
+        if self.isolation == 'savepoint':
+            self.skipTest('SQLITE_FULL откатывает всю транзакцию вместе с точкой сохранения теста')
+        for variant, create_table_sql in PRIMARY_KEY_VARIANTS.items():
+            with self.subTest(variant=variant):
+                self.cursor.execute(create_table_sql)
+                self.cursor.execute("INSERT INTO products (id, price) VALUES (?, 1.0);", (MAX_ROWID,))
+                if variant == 'autoincrement':
+                    with self.assertRaisesRegex(sqlite3.OperationalError, 'database or disk is full'):
+                        self.cursor.execute("INSERT INTO products (price) VALUES (2.0);")
+                else:
+                    self.cursor.execute("INSERT INTO products (price) VALUES (2.0);")
+                    self.assertEqual(self.conn.execute("SELECT count(*) FROM products;").fetchone()[0], 2)
+                self.cursor.execute("DROP TABLE products;")
 
     def test_create_table_with_combine_primary_key(self):
         # Создание таблицы с комбинированным первичным ключом
@@ -467,27 +718,14 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='students';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'students')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(students);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'student_id', 'INTEGER', 0, None, 1),
             (1, 'course_id', 'INTEGER', 0, None, 2)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'students', columns=expected_columns)
 
     def test_create_table_with_default_text_value(self):
         # Создание таблицы с `DEFAULT` значением для текстового столбца
@@ -499,27 +737,14 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'settings')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(settings);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'theme', 'TEXT', 0, "'light'", 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'settings', columns=expected_columns)
 
     def test_create_table_with_default_numeric_value(self):
         # Создание таблицы с `DEFAULT` значением для числового столбца
@@ -531,27 +756,14 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='products';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'products')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(products);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'price', 'REAL', 0, '0.0', 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'products', columns=expected_columns)
 
     def test_create_table_with_default_date_value(self):
         # Создание таблицы с `DEFAULT` значением для даты
@@ -563,40 +775,17 @@ class TestCreateTableSQL(unittest.TestCase):
         """
         self.cursor.execute(create_table_sql)
         self.conn.commit()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='products';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-        self.assertEqual(table[0], 'products')
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(products);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'id', 'INTEGER', 0, None, 1),
             (1, 'date', 'DATE', 0, "DATE('now')", 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(self.conn, 'products', columns=expected_columns)
 
     def test_create_table_with_multiple_foreign_keys(self):
-        # Создание таблицы с несколькими внешними ключами
-        create_parent_tables_sql = """
-        CREATE TABLE authors (
-            author_id INTEGER PRIMARY KEY
-        );
-        
-        CREATE TABLE publishers (
-            publisher_id INTEGER PRIMARY KEY
-        );
-        """
-
+        # Создание таблицы с несколькими внешними ключами на таблицы базовой схемы
         create_child_table_sql = """
         CREATE TABLE books (
             book_id INTEGER PRIMARY KEY,
@@ -607,22 +796,10 @@ class TestCreateTableSQL(unittest.TestCase):
         );
         """
 
-        for sql in create_parent_tables_sql.split(';'):
-            if sql.strip():
-                self.cursor.execute(sql.strip())
-
         self.cursor.execute(create_child_table_sql)
 
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='books';")
-        table = self.cursor.fetchone()
-        self.assertIsNotNone(table)
-
-        # Проверка столбцов
-        self.cursor.execute("PRAGMA table_info(books);")
-        columns = self.cursor.fetchall()
-
         # Ожидаемые столбцы с их атрибутами
         expected_columns = [
             (0, 'book_id', 'INTEGER', 0, None, 1),
@@ -630,12 +807,16 @@ class TestCreateTableSQL(unittest.TestCase):
             (2, 'publisher_id', 'INTEGER', 0, None, 0)
         ]
 
-        # Проверяем количество столбцов
-        self.assertEqual(len(columns), len(expected_columns))
-
-        # Проверяем атрибуты каждого столбца
-        for actual_column, expected_column in zip(columns, expected_columns):
-            self.assertEqual(actual_column, expected_column)
+        # Проверка таблицы и её столбцов
+        self.assertTableSchema(
+            self.conn, 'books',
+            columns=expected_columns,
+            # SQLite нумерует внешние ключи с последнего объявленного
+            foreign_keys=[
+                (0, 0, 'publishers', 'publisher_id', 'publisher_id'),
+                (1, 0, 'authors', 'author_id', 'author_id'),
+            ],
+        )
 
     def test_create_table_with_index(self):
         # Создание таблицы и индекса на неё
@@ -648,16 +829,13 @@ class TestCreateTableSQL(unittest.TestCase):
         CREATE INDEX idx_column_to_index ON indexed_table (column_to_index);
         """
 
-        for sql in create_table_sql.split(';'):
-            if sql.strip():
-                self.cursor.execute(sql.strip())
+        execute_script(self.conn, create_table_sql)
 
         self.conn.commit()
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_column_to_index';")
-        index = self.cursor.fetchone()
+        self.assertIndexExists(self.conn, 'idx_column_to_index')
 
-        self.assertIsNotNone(index)
+        self.assertTableSchema(self.conn, 'indexed_table', indexes=[('idx_column_to_index', 0, 'c', 0)])
 
     def test_create_table_invalid_syntax(self):
         # Негативный тест на создание таблицы с неверным синтаксисом (нет запятой после PRIMARY KEY)
@@ -711,7 +889,7 @@ class TestCreateTableSQL(unittest.TestCase):
         with self.assertRaises(sqlite3.OperationalError):
             self.cursor.execute(create_table_sql)
 
-    def test_create_table_invalid_symbols_name(self):
+    def test_create_table_with_two_words_name(self):
         # Негативный тест на создание таблицы с двумя словами в названии таблицы
         create_table_sql = """
         CREATE TABLE my customer  (
@@ -851,5 +1029,1314 @@ class TestCreateTableSQL(unittest.TestCase):
             self.cursor.execute(create_index)
 
 
+class TestTableVariants(TemplateDatabaseMixin, SchemaAssertionsMixin, unittest.TestCase):
+    def create_variant(self, name, variant):
+        self.cursor.execute(table_variant_sql(VARIANT_SCHEMAS[name], variant))
+        self.conn.commit()
+
+    def test_composite_primary_key_variants(self):
+        # Позитивный тест на table_info и index_list составного ключа в каждом варианте
+        rowid_columns = [
+            (0, 'student_id', 'INTEGER', 0, None, 1),
+            (1, 'course_id', 'INTEGER', 0, None, 2)
+        ]
+        not_null_columns = [
+            (0, 'student_id', 'INTEGER', 1, None, 1),
+            (1, 'course_id', 'INTEGER', 1, None, 2)
+        ]
+        # В rowid-таблице составной ключ - отдельный индекс, в WITHOUT ROWID - сама таблица
+        indexes = [('sqlite_autoindex_students_1', 1, 'pk', 0)]
+        expected = {
+            'rowid': (rowid_columns, (0, 0)),
+            'without_rowid': (not_null_columns, (1, 0)),
+            'strict': (not_null_columns, (0, 1)),
+            'without_rowid_strict': (not_null_columns, (1, 1)),
+        }
+        for variant, (columns, flags) in expected.items():
+            with self.subTest(variant=variant):
+                self.create_variant('students', variant)
+                self.assertTableSchema(self.conn, 'students', columns=columns, indexes=indexes)
+                self.assertEqual(
+                    self.conn.execute("SELECT wr, strict FROM pragma_table_list('students');").fetchone(), flags)
+                self.cursor.execute("DROP TABLE students;")
+
+    def test_integer_primary_key_variants(self):
+        # Позитивный тест на INTEGER PRIMARY KEY: индекс ключа появляется только в WITHOUT ROWID
+        for variant in TABLE_VARIANTS:
+            with self.subTest(variant=variant):
+                self.create_variant('settings', variant)
+                indexes = [('sqlite_autoindex_settings_1', 1, 'pk', 0)] if 'without_rowid' in variant else []
+                self.assertTableSchema(self.conn, 'settings', indexes=indexes)
+                self.cursor.execute("DROP TABLE settings;")
+
+    def test_positive_schemas_in_all_variants(self):
+        # Позитивный и негативный тесты на схемы позитивных тестов во всех вариантах: столбцы совпадают
+        # с rowid-таблицей с точностью до NOT NULL у ключа, либо вариант отвергается с понятной ошибкой
+        for name, create_table_sql in VARIANT_SCHEMAS.items():
+            self.cursor.execute(create_table_sql)
+            rowid_columns = fetch_table_schema(self.conn, name)['columns']
+            self.cursor.execute(f"DROP TABLE {name};")
+            for variant in TABLE_VARIANTS:
+                with self.subTest(table=name, variant=variant):
+                    if name == 'cities' and 'strict' in variant:
+                        with self.assertRaisesRegex(sqlite3.OperationalError, 'unknown datatype'):
+                            self.create_variant(name, variant)
+                        continue
+                    if name == 'cities_without_primary_key' and 'without_rowid' in variant:
+                        with self.assertRaisesRegex(sqlite3.OperationalError, 'PRIMARY KEY missing'):
+                            self.create_variant(name, variant)
+                        continue
+                    self.create_variant(name, variant)
+                    self.assertTableSchema(self.conn, name, columns=expected_variant_columns(rowid_columns, variant))
+                    self.cursor.execute(f"DROP TABLE {name};")
+
+    def test_strict_rejects_wrong_types(self):
+        # Негативный тест на вставку текста в INTEGER и NULL в ключ STRICT-таблицы
+        self.create_variant('students', 'strict')
+        with self.assertRaisesRegex(sqlite3.IntegrityError, 'cannot store TEXT value in INTEGER column'):
+            self.cursor.execute("INSERT INTO students (student_id, course_id) VALUES ('abc', 1);")
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.cursor.execute("INSERT INTO students (student_id, course_id) VALUES (NULL, 1);")
+        # Обычная таблица принимает те же строки
+        self.cursor.execute("DROP TABLE students;")
+        self.create_variant('students', 'rowid')
+        self.cursor.execute("INSERT INTO students (student_id, course_id) VALUES ('abc', 1), (NULL, 1);")
+        self.assertEqual(self.conn.execute("SELECT count(*) FROM students;").fetchone()[0], 2)
+
+
+class TestCreateTableOnBaseSchema(TemplateDatabaseMixin, unittest.TestCase):
+    # Проверки изоляции копий шаблона: базовая схема есть в каждой копии, изменения копии не попадают в шаблон
+    base_schema = PARENT_TABLES_SQL
+
+    def test_base_schema_is_cloned(self):
+        # Позитивный тест на наличие таблиц базовой схемы в копии
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+        tables = [row[0] for row in self.cursor.fetchall()]
+        self.assertEqual(tables, ['authors', 'publishers'])
+
+    def test_changes_do_not_leak_into_template(self):
+        # Позитивный тест на то, что изменения в копии не попадают в шаблон
+        self.cursor.execute("CREATE TABLE local_authors AS SELECT * FROM authors LIMIT 0;")
+        self.cursor.execute("INSERT INTO authors (author_id) VALUES (1);")
+        self.conn.commit()
+
+        template_cursor = self.template_conn.cursor()
+        template_cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='local_authors';")
+        self.assertIsNone(template_cursor.fetchone())
+        template_cursor.execute("SELECT count(*) FROM authors;")
+        self.assertEqual(template_cursor.fetchone()[0], 0)
+
+
+class TestForeignKeyEnforcement(TemplateDatabaseMixin, SchemaAssertionsMixin, unittest.TestCase):
+    base_schema = FOREIGN_KEY_SCHEMA_SQL + """
+    INSERT INTO cities (id, name) VALUES (1, 'Moscow'), (2, 'London');
+    INSERT INTO authors (author_id) VALUES (1), (2);
+    INSERT INTO publishers (publisher_id) VALUES (1);
+    INSERT INTO employees (id, name, age, city_id) VALUES (1, 'Ivan', 30, 1);
+    INSERT INTO books (book_id, author_id, publisher_id) VALUES (1, 1, 1);
+    """
+    foreign_keys = True
+
+    def test_foreign_keys_are_enabled(self):
+        # Позитивный тест на включение проверки внешних ключей в соединении теста
+        self.cursor.execute("PRAGMA foreign_keys;")
+        self.assertEqual(self.cursor.fetchone()[0], 1)
+
+    def test_insert_child_with_missing_parent(self):
+        # Негативный тест на вставку сотрудника с несуществующим городом
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.cursor.execute("INSERT INTO employees (id, name, age, city_id) VALUES (2, 'Anna', 25, 3);")
+
+    def test_insert_child_with_existing_or_null_parent(self):
+        # Позитивный тест на вставку с существующим родителем и с NULL во внешнем ключе
+        self.cursor.execute("INSERT INTO employees (id, name, age, city_id) VALUES (2, 'Anna', 25, 2);")
+        self.cursor.execute("INSERT INTO books (book_id, author_id, publisher_id) VALUES (2, 2, NULL);")
+        self.conn.commit()
+        self.assertRowsEqual(self.cursor.execute("PRAGMA foreign_key_check;"), [])
+
+    def test_insert_book_with_missing_publisher(self):
+        # Негативный тест на нарушение второго из нескольких внешних ключей
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.cursor.execute("INSERT INTO books (book_id, author_id, publisher_id) VALUES (2, 1, 2);")
+
+    def test_delete_referenced_parent(self):
+        # Негативный тест на удаление города, на который ссылается сотрудник
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.cursor.execute("DELETE FROM cities WHERE id = 1;")
+
+    def test_update_referenced_parent_key(self):
+        # Негативный тест на изменение ключа автора, на которого ссылается книга
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.cursor.execute("UPDATE authors SET author_id = 10 WHERE author_id = 1;")
+
+    def test_delete_unreferenced_parent(self):
+        # Позитивный тест на удаление города без сотрудников
+        self.cursor.execute("DELETE FROM cities WHERE id = 2;")
+        self.assertEqual(self.cursor.rowcount, 1)
+
+    def test_non_unique_parent_key(self):
+        # Негативный тест: в test_create_table_with_foreign_key_success cities.id не уникален,
+        # поэтому при включённых внешних ключах вставка в дочернюю таблицу невозможна
+        self.cursor.execute("CREATE TABLE regions (id INTEGER, name VARCHAR(80));")
+        self.cursor.execute("CREATE TABLE offices (id INTEGER PRIMARY KEY, region_id INTEGER REFERENCES regions(id));")
+        with self.assertRaisesRegex(sqlite3.OperationalError, 'foreign key mismatch'):
+            self.cursor.execute("INSERT INTO offices (id, region_id) VALUES (1, 1);")
+
+    def test_child_foreign_keys_without_index(self):
+        # Негативный тест: дочерние столбцы внешних ключей без индекса
+        self.assertEqual(unindexed_foreign_keys(self.conn), [
+            ('books', ('author_id',), 'authors'),
+            ('books', ('publisher_id',), 'publishers'),
+            ('employees', ('city_id',), 'cities'),
+        ])
+        with self.assertRaises(AssertionError):
+            self.assertForeignKeysIndexed(self.conn)
+
+    def test_primary_key_prefix_counts_as_index(self):
+        # Позитивный тест: дочерний столбец - INTEGER PRIMARY KEY (rowid) или ведущий столбец первичного ключа
+        # WITHOUT ROWID; ключ по второму столбцу первичного ключа индекса не имеет
+        execute_script(self.conn, CHILD_INDEXES_SQL + """
+        CREATE TABLE author_profiles (author_id INTEGER PRIMARY KEY REFERENCES authors(author_id), bio TEXT);
+        CREATE TABLE author_books (
+            author_id INTEGER REFERENCES authors(author_id),
+            book_id INTEGER REFERENCES books(book_id),
+            PRIMARY KEY (author_id, book_id)
+        ) WITHOUT ROWID;
+        """)
+        self.assertEqual(unindexed_foreign_keys(self.conn), [('author_books', ('book_id',), 'books')])
+
+    def test_child_foreign_keys_with_index(self):
+        # Позитивный тест: после создания индексов все внешние ключи покрыты
+        execute_script(self.conn, CHILD_INDEXES_SQL)
+        self.assertForeignKeysIndexed(self.conn)
+
+
+class TestSchemaInspector(TemplateDatabaseMixin, unittest.TestCase):
+    base_schema = FOREIGN_KEY_SCHEMA_SQL
+
+    def setUp(self):
+        super().setUp()
+        self.inspector = SchemaInspector(self.conn)
+
+    def test_catalog_matches_single_table_schema(self):
+        # Позитивный тест на совпадение кэша со схемой, прочитанной по одной таблице
+        self.assertEqual(self.inspector.tables(), ['authors', 'books', 'cities', 'employees', 'publishers'])
+        for table in self.inspector.tables():
+            self.assertEqual(self.inspector.table(table), fetch_table_schema(self.conn, table))
+        self.assertEqual(self.inspector.foreign_keys('employees'), [(0, 0, 'cities', 'city_id', 'id')])
+
+    def test_catalog_is_loaded_once_without_ddl(self):
+        # Позитивный тест: без DDL схема читается один раз
+        for _ in range(10):
+            self.inspector.columns('books')
+            self.inspector.has_table('cities')
+        self.cursor.execute("INSERT INTO cities (id, name) VALUES (1, 'Moscow');")
+        self.conn.commit()
+        self.inspector.indexes('books')
+        self.assertEqual(self.inspector.reloads, 1)
+
+    def test_catalog_is_reloaded_after_ddl(self):
+        # Позитивный тест на перечитывание схемы после CREATE TABLE, CREATE INDEX и DROP TABLE
+        self.assertFalse(self.inspector.has_table('users'))
+        self.cursor.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(80) UNIQUE NOT NULL);")
+        self.assertTrue(self.inspector.has_table('users'))
+        self.cursor.execute("CREATE INDEX idx_books_author_id ON books (author_id);")
+        self.assertEqual(self.inspector.indexes('books'), [('idx_books_author_id', 0, 'c', 0)])
+        self.cursor.execute("DROP TABLE users;")
+        self.assertFalse(self.inspector.has_table('users'))
+        self.assertEqual(self.inspector.reloads, 4)
+
+    def test_catalog_is_reloaded_after_ddl_in_other_connection(self):
+        # Позитивный тест на изменение схемы файла из другого соединения
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.db')
+            conn = sqlite3.connect(path)
+            other = sqlite3.connect(path)
+            inspector = SchemaInspector(conn)
+            self.assertEqual(inspector.tables(), [])
+            other.execute("CREATE TABLE cities (id INTEGER PRIMARY KEY, name VARCHAR(80));")
+            other.commit()
+            self.assertEqual(inspector.tables(), ['cities'])
+            other.close()
+            conn.close()
+
+    def test_catalog_after_rollback(self):
+        # Позитивный тест: откат DDL возвращает прежнюю schema_version, и новый DDL даёт ту же версию,
+        # что и у отменённой схемы; кэш не должен вернуть отменённую таблицу
+        self.cursor.execute("SAVEPOINT ddl;")
+        self.cursor.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        self.assertTrue(self.inspector.has_table('users'))
+        self.cursor.execute("ROLLBACK TO ddl;")
+        self.cursor.execute("RELEASE ddl;")
+        self.cursor.execute("CREATE TABLE books_archive (book_id INTEGER PRIMARY KEY);")
+        self.assertFalse(self.inspector.has_table('users'))
+        self.assertTrue(self.inspector.has_table('books_archive'))
+
+    def test_catalog_is_reused_inside_transaction(self):
+        # Позитивный тест: в транзакции без DDL схема читается один раз, после фиксации - ещё раз
+        self.cursor.execute("BEGIN;")
+        self.inspector.tables()
+        self.inspector.tables()
+        self.assertEqual(self.inspector.reloads, 1)
+        self.conn.commit()
+        self.inspector.tables()
+        self.inspector.tables()
+        self.assertEqual(self.inspector.reloads, 2)
+
+    def test_catalog_after_rollback_to_inside_transaction(self):
+        # Позитивный тест: в открытой транзакции откат к точке сохранения и новый DDL дают ту же
+        # schema_version, что и у отменённой схемы (как в SavepointConnection)
+        self.cursor.execute("BEGIN;")
+        self.cursor.execute("SAVEPOINT ddl;")
+        self.cursor.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        self.assertTrue(self.inspector.has_table('users'))
+        self.cursor.execute("ROLLBACK TO ddl;")
+        self.cursor.execute("CREATE TABLE books_archive (book_id INTEGER PRIMARY KEY);")
+        self.assertFalse(self.inspector.has_table('users'))
+        self.assertTrue(self.inspector.has_table('books_archive'))
+        self.assertTrue(self.inspector.has_table('books_archive'))
+        self.assertEqual(self.inspector.reloads, 2)
+        self.cursor.execute("ROLLBACK;")
+        self.assertFalse(self.inspector.has_table('books_archive'))
+
+
+class TestIndexUsage(TemplateDatabaseMixin, SchemaAssertionsMixin, unittest.TestCase):
+    base_schema = INDEXED_TABLE_SQL + """
+    WITH RECURSIVE series(value) AS (SELECT 1 UNION ALL SELECT value + 1 FROM series WHERE value < 200)
+    INSERT INTO indexed_table (column_to_index, payload)
+    SELECT 'value_' || value, 'payload_' || value FROM series;
+    """
+
+    def test_lookups_without_index_scan_table(self):
+        # Негативный тест: без индекса поиск по column_to_index выполняется полным сканированием
+        for variant in INDEX_VARIANTS.values():
+            plan = query_plan(self.conn, variant['equality_sql'], ('value_1',))
+            # До SQLite 3.36 строка плана - 'SCAN TABLE indexed_table'
+            self.assertFalse(uses_index(plan, variant['index_name']), plan)
+            self.assertTrue(any(re.match(r'SCAN (TABLE )?indexed_table\b', detail) for detail in plan), plan)
+
+    def test_lookups_use_index_variants(self):
+        # Позитивный тест на использование обычного, покрывающего, частичного и индекса по выражению
+        for name, variant in INDEX_VARIANTS.items():
+            with self.subTest(variant=name):
+                expected_equality = self.conn.execute(variant['equality_sql'], ('value_7',)).fetchall()
+                expected_range = self.conn.execute(variant['range_sql'], ('value_10', 'value_19')).fetchall()
+
+                self.cursor.execute(variant['index_sql'])
+                self.assertUsesIndex(self.conn, variant['equality_sql'], variant['index_name'], ('value_7',))
+                self.assertUsesIndex(self.conn, variant['range_sql'], variant['index_name'], ('value_10', 'value_19'))
+
+                # Результаты с индексом совпадают с результатами полного сканирования
+                self.assertEqual(self.conn.execute(variant['equality_sql'], ('value_7',)).fetchall(), expected_equality)
+                self.assertEqual(
+                    sorted(self.conn.execute(variant['range_sql'], ('value_10', 'value_19')).fetchall()),
+                    sorted(expected_range),
+                )
+                self.cursor.execute(f"DROP INDEX {variant['index_name']};")
+
+    def test_covering_index_is_reported(self):
+        # Позитивный тест на покрывающий индекс: данные читаются без обращения к таблице
+        variant = INDEX_VARIANTS['covering']
+        self.cursor.execute(variant['index_sql'])
+        plan = query_plan(self.conn, variant['equality_sql'], ('value_7',))
+        self.assertIn('USING COVERING INDEX idx_column_to_index_covering', plan[0])
+
+    def test_partial_index_is_not_used_for_null_lookup(self):
+        # Негативный тест: частичный индекс без NULL не подходит для поиска IS NULL
+        variant = INDEX_VARIANTS['partial']
+        self.cursor.execute(variant['index_sql'])
+        plan = query_plan(self.conn, 'SELECT payload FROM indexed_table WHERE column_to_index IS NULL;')
+        self.assertFalse(uses_index(plan, variant['index_name']))
+
+
+class TestSchemaAssertions(SchemaAssertionsMixin, unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.executescript("""
+        CREATE TABLE authors (
+            author_id INTEGER PRIMARY KEY
+        );
+
+        CREATE TABLE books (
+            book_id INTEGER PRIMARY KEY,
+            title TEXT UNIQUE,
+            author_id INTEGER REFERENCES authors(author_id)
+        );
+
+        CREATE INDEX idx_books_author_id ON books (author_id) WHERE author_id IS NOT NULL;
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_fetch_table_schema(self):
+        # Позитивный тест на получение столбцов, внешних ключей и индексов одним запросом
+        self.assertEqual(fetch_table_schema(self.conn, 'books'), {
+            'columns': [
+                (0, 'book_id', 'INTEGER', 0, None, 1),
+                (1, 'title', 'TEXT', 0, None, 0),
+                (2, 'author_id', 'INTEGER', 0, None, 0),
+            ],
+            'foreign_keys': [(0, 0, 'authors', 'author_id', 'author_id')],
+            'indexes': [
+                ('idx_books_author_id', 0, 'c', 1),
+                ('sqlite_autoindex_books_1', 1, 'u', 0),
+            ],
+        })
+
+    def test_fetch_composite_foreign_key(self):
+        # Позитивный тест: составной внешний ключ отличается от двух ключей по одному столбцу
+        self.conn.executescript("""
+        CREATE TABLE editions (book_id INTEGER, number INTEGER, PRIMARY KEY (book_id, number));
+        CREATE TABLE composite_reviews (
+            book_id INTEGER,
+            number INTEGER,
+            FOREIGN KEY (book_id, number) REFERENCES editions (book_id, number)
+        );
+        CREATE TABLE separate_reviews (
+            book_id INTEGER REFERENCES editions (book_id),
+            number INTEGER REFERENCES editions (number)
+        );
+        """)
+        self.assertTableSchema(self.conn, 'composite_reviews', foreign_keys=[
+            (0, 0, 'editions', 'book_id', 'book_id'),
+            (0, 1, 'editions', 'number', 'number'),
+        ])
+        self.assertNotEqual(fetch_table_schema(self.conn, 'separate_reviews')['foreign_keys'],
+                            fetch_table_schema(self.conn, 'composite_reviews')['foreign_keys'])
+
+    def test_fetch_missing_table_schema(self):
+        # Негативный тест на получение схемы несуществующей таблицы
+        self.assertIsNone(fetch_table_schema(self.conn, 'publishers'))
+
+    def test_assert_table_schema_reports_missing_table(self):
+        # Негативный тест на проверку схемы несуществующей таблицы
+        with self.assertRaisesRegex(AssertionError, "'publishers' не найдена"):
+            self.assertTableSchema(self.conn, 'publishers', columns=[])
+
+    def test_assert_table_schema_reports_difference(self):
+        # Негативный тест на проверку схемы с отличающимся внешним ключом
+        with self.assertRaisesRegex(AssertionError, 'foreign_keys'):
+            self.assertTableSchema(self.conn, 'books', foreign_keys=[(0, 0, 'publishers', 'author_id', 'publisher_id')])
+
+    def test_assert_table_and_index_exist(self):
+        # Позитивный и негативный тесты на поиск таблиц и индексов с привязанными параметрами
+        self.assertTableExists(self.conn, 'books')
+        self.assertIndexExists(self.conn, 'idx_books_author_id')
+        with self.assertRaisesRegex(AssertionError, "Таблица 'publishers' не найдена"):
+            self.assertTableExists(self.conn, 'publishers')
+        # Индекс не является таблицей, а таблица - индексом
+        with self.assertRaisesRegex(AssertionError, "Таблица 'idx_books_author_id' не найдена"):
+            self.assertTableExists(self.conn, 'idx_books_author_id')
+        with self.assertRaisesRegex(AssertionError, "Индекс 'books' не найден"):
+            self.assertIndexExists(self.conn, 'books')
+
+    def test_assert_rows_equal(self):
+        # Позитивный и негативные тесты на потоковое сравнение строк с индексом первого расхождения
+        self.conn.executemany("INSERT INTO authors (author_id) VALUES (?);", [(1,), (2,), (3,)])
+        select_sql = "SELECT author_id FROM authors ORDER BY author_id;"
+        self.assertRowsEqual(self.conn.execute(select_sql), [[1], [2], [3]])
+        with self.assertRaisesRegex(AssertionError, r'Строка 1 отличается: \(2,\) != \(5,\)'):
+            self.assertRowsEqual(self.conn.execute(select_sql), [(1,), (5,), (3,)])
+        with self.assertRaisesRegex(AssertionError, 'Результат закончился на строке 3'):
+            self.assertRowsEqual(self.conn.execute(select_sql), [(1,), (2,), (3,), (4,)])
+        with self.assertRaisesRegex(AssertionError, r'Лишняя строка 2 в результате: \(3,\)'):
+            self.assertRowsEqual(self.conn.execute(select_sql), [(1,), (2,)])
+
+    def test_assert_rows_equal_memory_is_bounded(self):
+        # Позитивный тест на то, что память не растёт с числом строк: сравниваются 100k строк из генераторов
+        row_count = 100_000
+        cursor = self.conn.execute(
+            "WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < ?) "
+            "SELECT n, 'row_' || n FROM numbers;", (row_count,))
+        cursor.arraysize = 500
+        tracemalloc.start()
+        try:
+            self.assertRowsEqual(cursor, ((n, f'row_{n}') for n in range(1, row_count + 1)))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # fetchall() этого результата занимает около 15 МБ
+        self.assertLess(peak, 1_000_000)
+
+    def test_table_fingerprint(self):
+        # Позитивный тест на отпечаток: не зависит от порядка строк и совпадает с вычисленным в Python
+        rows = [(1, 'a', None), (2, 'b', 1), (3, 'c', 2)]
+        self.conn.executemany("INSERT INTO books (book_id, title, author_id) VALUES (?, ?, ?);", reversed(rows))
+        columns = ('book_id', 'title', 'author_id')
+        expected = expected_fingerprint(rows, columns, ('book_id', 'author_id'))
+        self.assertEqual(expected['totals'], {'book_id': 6.0, 'author_id': 3.0})
+        self.assertEqual(table_fingerprint(self.conn, 'books', ('book_id', 'author_id')), expected)
+        self.assertTableFingerprint(self.conn, 'books', expected)
+
+    def test_assert_table_fingerprint_reports_difference(self):
+        # Негативный тест на отличие в одном значении при совпадающих количестве строк и суммах
+        self.conn.executemany("INSERT INTO books (book_id, title) VALUES (?, ?);", [(1, 'a'), (2, 'b')])
+        expected = expected_fingerprint([(1, 'a', None), (2, 'B', None)], ('book_id', 'title', 'author_id'), ('book_id',))
+        with self.assertRaisesRegex(AssertionError, "Хеш строк 'books' отличается"):
+            self.assertTableFingerprint(self.conn, 'books', expected)
+        # Целое 1 и строка '1' различаются
+        self.assertNotEqual(row_hash((1,)), row_hash(('1',)))
+
+
+class TestCloneTable(SchemaAssertionsMixin, unittest.TestCase):
+    source_sql = """
+    CREATE TABLE cities (
+        id INTEGER PRIMARY KEY
+    );
+
+    CREATE TABLE "my employees" (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(80) NOT NULL,
+        email TEXT UNIQUE,
+        age INTEGER DEFAULT 18 CHECK(age >= 18),
+        city_id INTEGER REFERENCES cities(id)
+    );
+
+    CREATE INDEX "idx_my employees_city_id" ON "my employees" (city_id);
+    CREATE INDEX idx_adults ON "my employees" (age) WHERE age >= 65;
+
+    CREATE TABLE audit (employee_id INTEGER, action TEXT);
+
+    CREATE TRIGGER "my employees_audit" AFTER INSERT ON "my employees"
+    BEGIN
+        INSERT INTO audit (employee_id, action) VALUES (new.id, 'insert');
+    END;
+    """
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.executescript(self.source_sql)
+        self.conn.execute("INSERT INTO cities (id) VALUES (1);")
+        self.conn.executemany(
+            'INSERT INTO "my employees" (name, email, age, city_id) VALUES (?, ?, ?, ?);',
+            [(f'employee_{n}', f'e{n}@example.com', 18 + n % 60, 1) for n in range(25)])
+        self.conn.execute('DELETE FROM "my employees" WHERE id = 25;')
+        self.conn.execute("DELETE FROM audit;")
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_clone_keeps_constraints_indexes_and_triggers(self):
+        # Позитивный тест на полную копию: столбцы, внешние ключи, форма индексов, триггер и данные
+        progress = []
+        copied = clone.clone_table(self.conn, 'my employees', 'employees_copy', batch_size=10,
+                                   progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(copied, 24)
+        self.assertEqual(progress, [(10, 24), (20, 24), (24, 24)])
+
+        source = fetch_table_schema(self.conn, 'my employees')
+        self.assertTableSchema(self.conn, 'employees_copy', columns=source['columns'],
+                               foreign_keys=source['foreign_keys'])
+        self.assertEqual(unique_index_shapes(self.conn, 'employees_copy'), unique_index_shapes(self.conn, 'my employees'))
+        self.assertIndexExists(self.conn, 'idx_employees_copy_city_id')
+        self.assertIndexExists(self.conn, 'employees_copy_idx_adults')
+        self.assertRowsEqual(self.conn.execute("SELECT * FROM employees_copy ORDER BY id;"),
+                             self.conn.execute('SELECT * FROM "my employees" ORDER BY id;'))
+
+        # Ограничения работают в копии
+        with self.assertRaisesRegex(sqlite3.IntegrityError, 'UNIQUE constraint failed: employees_copy.email'):
+            self.conn.execute("INSERT INTO employees_copy (name, email) VALUES ('x', 'e1@example.com');")
+        with self.assertRaisesRegex(sqlite3.IntegrityError, 'CHECK constraint failed'):
+            self.conn.execute("INSERT INTO employees_copy (name, age) VALUES ('x', 10);")
+
+        # Триггер не срабатывал при копировании и срабатывает на новых строках; id 25 не выдаётся повторно
+        self.conn.execute("INSERT INTO employees_copy (name) VALUES ('new');")
+        self.assertRowsEqual(self.conn.execute("SELECT employee_id, action FROM audit;"), [(26, 'insert')])
+        self.assertRowsEqual(self.conn.execute("SELECT name, seq FROM sqlite_sequence ORDER BY name;"),
+                             [('employees_copy', 26), ('my employees', 25)])
+
+    def test_clone_schema_only(self):
+        # Позитивный тест на копию без данных, в отличие от CREATE TABLE ... AS SELECT ... LIMIT 0
+        self.assertEqual(clone.clone_table(self.conn, 'my employees', 'employees_copy', copy_data=False), 0)
+        self.assertRowsEqual(self.conn.execute("SELECT count(*) FROM employees_copy;"), [(0,)])
+        self.assertEqual(fetch_table_schema(self.conn, 'employees_copy')['columns'],
+                         fetch_table_schema(self.conn, 'my employees')['columns'])
+
+    def test_clone_without_rowid_table(self):
+        # Позитивный тест на копию таблицы WITHOUT ROWID одним оператором
+        self.conn.execute(table_variant_sql(VARIANT_SCHEMAS['students'], 'without_rowid'))
+        self.conn.executemany("INSERT INTO students VALUES (?, ?);", [(1, 1), (1, 2), (2, 1)])
+        self.conn.commit()
+        self.assertEqual(clone.clone_table(self.conn, 'students', 'students_copy'), 3)
+        self.assertEqual(self.conn.execute("SELECT wr FROM pragma_table_list('students_copy');").fetchone(), (1,))
+        self.assertRowsEqual(self.conn.execute("SELECT * FROM students_copy ORDER BY 1, 2;"), [(1, 1), (1, 2), (2, 1)])
+
+    def test_clone_missing_table(self):
+        # Негативный тест на копию несуществующей таблицы
+        with self.assertRaisesRegex(ValueError, "'publishers' не найдена"):
+            clone.clone_table(self.conn, 'publishers', 'publishers_copy')
+
+    def test_clone_refuses_open_transaction(self):
+        # Негативный тест: копирование фиксирует пачки, поэтому транзакция вызывающего не должна быть открыта
+        self.conn.execute("DELETE FROM audit;")
+        with self.assertRaisesRegex(ValueError, 'открытую транзакцию'):
+            clone.clone_table(self.conn, 'my employees', 'employees_copy')
+        self.assertTrue(self.conn.in_transaction)
+        self.assertFalse(catalog_object_exists(self.conn, 'table', 'employees_copy'))
+        self.conn.rollback()
+
+    def test_clone_removes_partial_copy_on_error(self):
+        # Негативный тест: ошибка после зафиксированных пачек удаляет копию вместе с её строкой sqlite_sequence
+        def fail_after_first_batch(done, total):
+            raise RuntimeError('copy interrupted')
+
+        with self.assertRaisesRegex(RuntimeError, 'copy interrupted'):
+            clone.clone_table(self.conn, 'my employees', 'employees_copy', batch_size=10,
+                              progress=fail_after_first_batch)
+        self.assertFalse(catalog_object_exists(self.conn, 'table', 'employees_copy'))
+        self.assertRowsEqual(self.conn.execute("SELECT name FROM sqlite_sequence;"), [('my employees',)])
+
+    def test_clone_finds_index_with_differently_cased_table_name(self):
+        # Позитивный тест: tbl_name индекса хранит имя таблицы так, как оно написано в CREATE INDEX
+        self.conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT);")
+        self.conn.execute("CREATE INDEX idx_t_name ON T (name);")
+        clone.clone_table(self.conn, 'T', 't2')
+        self.assertIndexExists(self.conn, 'idx_t2_name')
+
+    def test_clone_self_referencing_foreign_key(self):
+        # Позитивный тест на внешний ключ таблицы на саму себя: в копии он ссылается на копию
+        self.conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, parent_id INTEGER REFERENCES t(id));")
+        self.conn.executemany("INSERT INTO t (id, parent_id) VALUES (?, ?);", [(1, None), (2, 1)])
+        self.conn.commit()
+        clone.clone_table(self.conn, 't', 't2')
+        self.assertEqual([row[2] for row in self.conn.execute("PRAGMA foreign_key_list(t2);")], ['t2'])
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        self.conn.execute("DELETE FROM t WHERE id = 2;")
+        with self.assertRaisesRegex(sqlite3.IntegrityError, 'FOREIGN KEY constraint failed'):
+            self.conn.execute("DELETE FROM t2 WHERE id = 1;")
+
+    def test_clone_trigger_writes_to_clone(self):
+        # Позитивный тест на тело триггера: триггер копии изменяет копию, а не исходную таблицу
+        self.conn.executescript("""
+        CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, updated INTEGER DEFAULT 0);
+        CREATE TRIGGER t_touch AFTER UPDATE OF name ON t
+        BEGIN
+            UPDATE t SET updated = updated + 1 WHERE id = new.id;
+        END;
+        INSERT INTO t (id, name) VALUES (1, 'a');
+        """)
+        clone.clone_table(self.conn, 't', 't2')
+        self.conn.execute("UPDATE t2 SET name = 'b' WHERE id = 1;")
+        self.assertRowsEqual(self.conn.execute("SELECT updated FROM t2;"), [(1,)])
+        self.assertRowsEqual(self.conn.execute("SELECT updated FROM t;"), [(0,)])
+        self.assertTrue(catalog_object_exists(self.conn, 'trigger', 't2_touch'))
+
+    def test_clone_refuses_ambiguous_trigger(self):
+        # Негативный тест на триггер, в котором имя таблицы совпадает с именем столбца: копия не создаётся
+        self.conn.executescript("""
+        CREATE TABLE t (id INTEGER PRIMARY KEY, t INTEGER DEFAULT 0);
+        CREATE TRIGGER t_touch AFTER UPDATE OF id ON t
+        BEGIN
+            UPDATE t SET t = t + 1 WHERE id = new.id;
+        END;
+        """)
+        with self.assertRaisesRegex(ValueError, "Триггер 't_touch'"):
+            clone.clone_table(self.conn, 't', 't2')
+        self.assertFalse(catalog_object_exists(self.conn, 'table', 't2'))
+
+    def test_clone_object_name(self):
+        # Позитивный тест на имена индексов и триггеров копии: заменяется только имя таблицы целым словом
+        self.assertEqual(clone.clone_object_name('t_touch', 't', 't2'), 't2_touch')
+        self.assertEqual(clone.clone_object_name('idx_name_a', 'a', 'b'), 'idx_name_b')
+        self.assertEqual(clone.clone_object_name('idx_name', 'a', 'b'), 'b_idx_name')
+
+    def test_rename_ddl(self):
+        # Позитивный тест на замену имён в DDL с разными видами кавычек
+        self.assertEqual(clone.rename_table_ddl('CREATE TABLE [old table](id)', 'new'), 'CREATE TABLE "new"(id)')
+        self.assertEqual(clone.rename_index_ddl('CREATE UNIQUE INDEX `i` ON "t" (a)', 'j', 'u'),
+                         'CREATE UNIQUE INDEX "j" ON "u" (a)')
+        self.assertEqual(
+            clone.rename_trigger_ddl('CREATE TRIGGER tr BEFORE UPDATE OF a ON t BEGIN SELECT 1; END', 'tr2', 'u'),
+            'CREATE TRIGGER "tr2" BEFORE UPDATE OF a ON "u" BEGIN SELECT 1; END')
+
+
+class TestExecuteScript(unittest.TestCase):
+    script = """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY,
+        name TEXT DEFAULT 'a;b',
+        note TEXT CHECK(note <> ';')
+    );
+
+    CREATE TABLE audit (product_id INTEGER); CREATE TRIGGER products_audit AFTER INSERT ON products
+    BEGIN
+        INSERT INTO audit (product_id) VALUES (new.id);
+    END;
+    INSERT INTO products (id) VALUES (1);
+    """
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_iter_statements_keeps_semicolons_inside_statements(self):
+        # Позитивный тест на разбиение скрипта с ';' в литералах, CHECK и теле триггера
+        statements = list(iter_statements(self.script))
+        self.assertEqual([(index, line_number) for index, line_number, _ in statements], [(0, 2), (1, 8), (2, 8), (3, 12)])
+        self.assertTrue(statements[0][2].endswith("CHECK(note <> ';')\n    );"))
+        self.assertTrue(statements[2][2].endswith('END;'))
+
+    def test_iter_statements_from_file(self):
+        # Позитивный тест на потоковое чтение скрипта из файла
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'schema.sql')
+            with open(path, 'w', encoding='utf-8') as script_file:
+                script_file.write(self.script)
+            with open(path, encoding='utf-8') as script_file:
+                statements = list(iter_statements(script_file))
+        self.assertEqual(statements, list(iter_statements(self.script)))
+
+    def test_iter_statements_without_trailing_semicolon(self):
+        # Позитивный тест на последний оператор без точки с запятой
+        statements = list(iter_statements("CREATE TABLE a (x);\nCREATE TABLE b (y)"))
+        self.assertEqual(statements, [(0, 1, 'CREATE TABLE a (x);'), (1, 2, 'CREATE TABLE b (y)')])
+
+    def test_execute_script(self):
+        # Позитивный тест на выполнение скрипта по одному оператору и пачками
+        for batch_size in (None, 2):
+            with self.subTest(batch_size=batch_size):
+                conn = sqlite3.connect(':memory:')
+                execute_script(conn, self.script, batch_size=batch_size)
+                self.assertEqual(conn.execute("SELECT product_id FROM audit;").fetchall(), [(1,)])
+                self.assertEqual(conn.execute("SELECT name FROM products;").fetchall(), [('a;b',)])
+                conn.close()
+
+    def test_execute_script_dump(self):
+        # Позитивный тест на скрипт со своей транзакцией, как в выводе .dump и Connection.iterdump()
+        self.conn.executescript(self.script)
+        dump = '\n'.join(self.conn.iterdump())
+        self.assertTrue(dump.startswith('BEGIN TRANSACTION;'))
+        for batch_size in (None, 2, 100):
+            with self.subTest(batch_size=batch_size):
+                conn = sqlite3.connect(':memory:')
+                execute_script(conn, dump, batch_size=batch_size)
+                self.assertFalse(conn.in_transaction)
+                self.assertEqual(list(conn.iterdump()), list(self.conn.iterdump()))
+                conn.close()
+
+    def test_execute_script_batches_dump(self):
+        # Позитивный тест: транзакция скрипта выполняется одним executescript, а не по одному оператору
+        class ScriptCursor(sqlite3.Cursor):
+            def executescript(self, sql_script):
+                self.connection.scripts.append(sql_script)
+                return super().executescript(sql_script)
+
+        class ScriptConnection(sqlite3.Connection):
+            scripts = []
+
+            def cursor(self, factory=ScriptCursor):
+                return super().cursor(factory)
+
+        self.conn.executescript(self.script)
+        dump = '\n'.join(self.conn.iterdump())
+        conn = sqlite3.connect(':memory:', factory=ScriptConnection)
+        self.addCleanup(conn.close)
+        execute_script(conn, dump, batch_size=2)
+        self.assertEqual(conn.scripts, [dump])
+        self.assertEqual(list(conn.iterdump()), list(self.conn.iterdump()))
+
+    def test_execute_script_transaction_state(self):
+        # Позитивный тест: после скрипта состояние транзакции не зависит от режима
+        scripts = {
+            'CREATE TABLE a (x);\nINSERT INTO a VALUES (1);\nINSERT INTO a VALUES (2);\n': False,
+            'CREATE TABLE a (x);\nBEGIN;\nINSERT INTO a VALUES (1);\nCOMMIT;\nINSERT INTO a VALUES (2);\n': False,
+            'CREATE TABLE a (x);\nBEGIN;\nINSERT INTO a VALUES (1);\nINSERT INTO a VALUES (2);\n': True,
+        }
+        for script, in_transaction in scripts.items():
+            for batch_size in (None, 2):
+                with self.subTest(script=script, batch_size=batch_size):
+                    conn = sqlite3.connect(':memory:')
+                    execute_script(conn, script, batch_size=batch_size)
+                    self.assertEqual(conn.in_transaction, in_transaction)
+                    self.assertEqual(conn.execute("SELECT x FROM a ORDER BY x;").fetchall(), [(1,), (2,)])
+                    conn.close()
+
+    def test_execute_script_dump_reports_failed_statement(self):
+        # Негативный тест на ошибку внутри транзакции скрипта: указан упавший оператор
+        script = "BEGIN TRANSACTION;\nCREATE TABLE a (x);\nCREATE TABLE a (z);\nCOMMIT;\n"
+        for batch_size in (None, 10):
+            with self.subTest(batch_size=batch_size):
+                conn = sqlite3.connect(':memory:')
+                with self.assertRaises(sqlite3.OperationalError) as context:
+                    execute_script(conn, script, batch_size=batch_size)
+                self.assertEqual(context.exception.statement_index, 2)
+                self.assertEqual(context.exception.line_number, 3)
+                conn.close()
+
+    def test_execute_script_reports_failed_statement(self):
+        # Негативный тест на указание индекса и строки упавшего оператора
+        script = "CREATE TABLE a (x);\nCREATE TABLE b (y);\n\nCREATE TABLE a (z);\n"
+        for batch_size in (None, 10):
+            with self.subTest(batch_size=batch_size):
+                conn = sqlite3.connect(':memory:')
+                with self.assertRaises(sqlite3.OperationalError) as context:
+                    execute_script(conn, script, batch_size=batch_size)
+                self.assertEqual(context.exception.statement_index, 2)
+                self.assertEqual(context.exception.line_number, 4)
+                self.assertEqual(context.exception.statement, 'CREATE TABLE a (z);')
+                conn.close()
+
+
+class TestCreateTableSQLSavepoint(TestCreateTableSQL):
+    # Те же тесты в режиме изоляции через SAVEPOINT на одном соединении
+    isolation = 'savepoint'
+
+
+class TestCreateTableSQLFileRollbackJournal(TestCreateTableSQL):
+    backend = 'file_rollback_journal'
+
+
+class TestCreateTableSQLFileWAL(TestCreateTableSQL):
+    backend = 'file_wal'
+
+
+class TestCreateTableSQLFileWALSynchronousNormal(TestCreateTableSQL):
+    backend = 'file_wal_synchronous_normal'
+
+
+class TestCreateTableSQLFileWALSynchronousOff(TestCreateTableSQL):
+    backend = 'file_wal_synchronous_off'
+
+
+# Основной набор тестов для каждого бэкенда
+BACKEND_TEST_CASES = {
+    test_case.backend: test_case
+    for test_case in (
+        TestCreateTableSQL,
+        TestCreateTableSQLFileRollbackJournal,
+        TestCreateTableSQLFileWAL,
+        TestCreateTableSQLFileWALSynchronousNormal,
+        TestCreateTableSQLFileWALSynchronousOff,
+    )
+}
+
+
+class TestSavepointIsolation(TemplateDatabaseMixin, SchemaAssertionsMixin, unittest.TestCase):
+    isolation = 'savepoint'
+    base_schema = """
+    CREATE TABLE cities (
+        id INTEGER PRIMARY KEY,
+        name VARCHAR(80)
+    );
+    """
+
+    def test_commit_does_not_end_savepoint(self):
+        # Позитивный тест на то, что commit() внутри теста не завершает транзакцию
+        self.cursor.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        self.conn.commit()
+        self.assertTrue(self.conn.in_transaction)
+
+        self.assertTableExists(self.conn, 'users')
+
+    def test_rollback_undoes_table_and_index(self):
+        # Позитивный тест на откат CREATE TABLE и CREATE INDEX до точки сохранения
+        self.cursor.execute("CREATE TABLE indexed_table (id INTEGER PRIMARY KEY, column_to_index TEXT);")
+        self.cursor.execute("CREATE INDEX idx_column_to_index ON indexed_table (column_to_index);")
+        self.cursor.execute("INSERT INTO cities (id, name) VALUES (1, 'Moscow');")
+        self.conn.commit()
+
+        self.conn.rollback_test()
+        self.assertEqual(read_schema(self.conn), self.class_schema)
+        self.assertEqual(self.conn.execute("SELECT count(*) FROM cities;").fetchone()[0], 0)
+        # tearDown ожидает активную точку сохранения
+        self.conn.begin_test()
+
+    def test_base_schema_is_available(self):
+        # Позитивный тест на наличие базовой схемы в соединении класса
+        self.assertTableExists(self.conn, 'cities')
+
+
+class TestConcurrentDDL(TemplateDatabaseMixin, unittest.TestCase):
+    # Несколько соединений к одному файлу базы в режиме WAL
+    backend = 'file_wal'
+
+    def connect_writer(self, timeout):
+        # Ещё одно соединение к файлу базы теста, в режиме автофиксации
+        path = os.path.join(self.database_directory, f'{self._testMethodName}.db')
+        return sqlite3.connect(path, timeout=timeout, isolation_level=None)
+
+    def test_only_one_create_table_succeeds(self):
+        # Позитивный тест на то, что из одновременных CREATE TABLE employees успешен ровно один,
+        # а остальные писатели после ожидания блокировки видят уже созданную таблицу
+        writer_count = 8
+        barrier = threading.Barrier(writer_count)
+        outcomes = []
+
+        def create_employees():
+            conn = self.connect_writer(timeout=5)
+            barrier.wait()
+            try:
+                conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL);")
+                outcomes.append('created')
+            except sqlite3.OperationalError as error:
+                outcomes.append(str(error))
+            finally:
+                conn.close()
+
+        writers = [threading.Thread(target=create_employees) for _ in range(writer_count)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        self.assertEqual(sorted(outcomes), ['created'] + ['table employees already exists'] * (writer_count - 1))
+        self.assertTrue(catalog_object_exists(self.conn, 'table', 'employees'))
+
+    def test_create_table_waits_for_writer_until_timeout(self):
+        # Негативный тест на SQLITE_BUSY: пока другое соединение держит блокировку записи,
+        # CREATE TABLE ждёт timeout и завершается ошибкой
+        self.conn.isolation_level = None
+        self.conn.execute("BEGIN IMMEDIATE;")
+        writer = self.connect_writer(timeout=0.05)
+        started = time.perf_counter()
+        with self.assertRaises(sqlite3.OperationalError) as context:
+            writer.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        self.assertEqual(context.exception.sqlite_errorname, 'SQLITE_BUSY')
+        self.conn.execute("COMMIT;")
+
+        writer.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        writer.close()
+        self.assertTrue(catalog_object_exists(self.conn, 'table', 'users'))
+
+    def test_create_table_in_stale_read_transaction(self):
+        # Негативный тест на SQLITE_BUSY_SNAPSHOT: транзакция чтения видит схему до чужого CREATE TABLE,
+        # и запись в ней отклоняется сразу, без ожидания timeout
+        reader = self.connect_writer(timeout=5)
+        reader.execute("BEGIN;")
+        reader.execute("SELECT count(*) FROM sqlite_master;").fetchone()
+        self.conn.execute("CREATE TABLE cities (id INTEGER PRIMARY KEY);")
+
+        with self.assertRaises(sqlite3.OperationalError) as context:
+            reader.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        self.assertEqual(context.exception.sqlite_errorname, 'SQLITE_BUSY_SNAPSHOT')
+        reader.execute("ROLLBACK;")
+
+        reader.execute("CREATE TABLE users (id INTEGER PRIMARY KEY);")
+        reader.close()
+
+
+class TestShardedRunner(unittest.TestCase):
+    def test_split_into_shards_balances_by_timings(self):
+        # Позитивный тест на балансировку шардов по времени прошлых запусков
+        timings = {'a': 4.0, 'b': 3.0, 'c': 2.0, 'd': 2.0, 'e': 1.0}
+        shards = runner.split_into_shards(['a', 'b', 'c', 'd', 'e'], timings, 2)
+        loads = sorted(sum(timings[test_id] for test_id in shard) for shard in shards)
+        self.assertEqual(loads, [6.0, 6.0])
+        self.assertEqual(sorted(test_id for shard in shards for test_id in shard), ['a', 'b', 'c', 'd', 'e'])
+
+    def test_split_into_shards_skips_empty_shards(self):
+        # Позитивный тест на то, что лишние процессы не получают пустых шардов
+        shards = runner.split_into_shards(['a'], {}, 4)
+        self.assertEqual(shards, [['a']])
+
+    def test_run_shard_records_outcomes(self):
+        # Позитивный тест на сбор результатов шарда
+        test_ids = [
+            'tests.TestCreateTableSQL.test_create_table_with_index',
+            'tests.TestCreateTableSQL.test_create_table_without_column',
+        ]
+        records = runner.run_shard(test_ids)
+        self.assertEqual([record['id'] for record in records], test_ids)
+        self.assertEqual([record['outcome'] for record in records], ['success', 'success'])
+        # CREATE TABLE и CREATE INDEX, COMMIT и запрос схемы через assertTableSchema
+        self.assertGreaterEqual(records[0]['statements'], 4)
+        # Оператор с синтаксической ошибкой не проходит подготовку и не попадает в trace callback
+        self.assertEqual(records[1]['statements'], 0)
+
+    def write_test_modules(self, modules):
+        # Временные модули с тестами, которые шард загружает по имени, в том числе в дочернем процессе.
+        # Возвращает каталог модулей
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        for name, source in modules.items():
+            with open(os.path.join(directory, f'{name}.py'), 'w', encoding='utf-8') as module_file:
+                module_file.write(source)
+            self.addCleanup(sys.modules.pop, name, None)
+        sys.path.insert(0, directory)
+        self.addCleanup(sys.path.remove, directory)
+        return directory
+
+    def test_run_sharded_reports_class_fixture_error(self):
+        # Негативный тест на ошибку setUpClass в шарде: ошибка попадает в отчёт, а не теряется вместе с тестами класса
+        self.write_test_modules({'sharded_fixture_error': (
+            'import unittest\n'
+            'class TestBroken(unittest.TestCase):\n'
+            '    @classmethod\n'
+            '    def setUpClass(cls):\n'
+            '        raise RuntimeError("broken fixture")\n'
+            '    def test_nothing(self):\n'
+            '        pass\n'
+            'class TestPassing(unittest.TestCase):\n'
+            '    def test_nothing(self):\n'
+            '        pass\n'
+        )})
+        test_ids = ['sharded_fixture_error.TestBroken.test_nothing', 'sharded_fixture_error.TestPassing.test_nothing']
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                records = runner.run_sharded(test_ids, {}, workers)
+                outcomes = {record['id']: record['outcome'] for record in records}
+                self.assertEqual(outcomes, {
+                    'setUpClass (sharded_fixture_error.TestBroken)': 'error',
+                    'sharded_fixture_error.TestPassing.test_nothing': 'success',
+                })
+                self.assertIn('broken fixture', records[-1]['message'])
+
+    def test_run_sharded_reports_crashed_worker(self):
+        # Негативный тест на аварийное завершение процесса: тесты его шарда - ошибки, а не необработанное исключение
+        self.write_test_modules({'sharded_crashed_worker': (
+            'import os\n'
+            'import unittest\n'
+            'class TestCrash(unittest.TestCase):\n'
+            '    def test_exit(self):\n'
+            '        os._exit(1)\n'
+            '    def test_nothing(self):\n'
+            '        pass\n'
+        )})
+        test_ids = ['sharded_crashed_worker.TestCrash.test_exit', 'sharded_crashed_worker.TestCrash.test_nothing']
+        records = runner.run_sharded(test_ids, {}, 2)
+        self.assertEqual([record['id'] for record in records], test_ids)
+        self.assertIn('error', [record['outcome'] for record in records])
+        self.assertIn('BrokenProcessPool', records[0]['message'])
+
+    def test_save_timings_skips_fixture_records(self):
+        # Позитивный тест: время ошибки фикстуры класса не попадает в файл таймингов, время теста - попадает
+        test_id = 'tests.TestCreateTableSQL.test_create_table_with_index'
+        records = [
+            {'id': 'setUpClass (tests.TestCreateTableSQL)', 'outcome': 'error', 'duration': 0.0},
+            {'id': test_id, 'outcome': 'success', 'duration': 0.5},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'timings.json')
+            runner.save_timings(path, {}, records, {test_id})
+            self.assertEqual(runner.load_json(path), {test_id: 0.5})
+
+    def test_run_concurrent_records_outcomes(self):
+        # Позитивный тест на выполнение тестов в потоках: классы с отдельными соединениями и класс с SAVEPOINT
+        test_ids = [
+            'tests.TestCreateTableSQLFileWAL.test_create_table_with_index',
+            'tests.TestCreateTableSQLFileWAL.test_create_table_without_column',
+            'tests.TestCreateTableSQLFileWAL.test_create_table_using_copy_with_data',
+            'tests.TestSavepointIsolation.test_rollback_undoes_table_and_index',
+            'tests.TestCreateTableOnBaseSchema.test_base_schema_is_cloned',
+        ]
+        records = runner.run_concurrent(test_ids, concurrency=4)
+        self.assertEqual([record['id'] for record in records], test_ids)
+        self.assertEqual([record['outcome'] for record in records], ['success'] * len(test_ids))
+        self.assertGreaterEqual(records[0]['statements'], 4)
+
+    def test_run_concurrent_reports_class_fixture_error(self):
+        # Негативный тест на ошибку setUpClass: тесты класса не выполняются, ошибка попадает в отчёт
+        class BrokenFixture(TemplateDatabaseMixin, unittest.TestCase):
+            backend = 'unknown'
+
+            def test_nothing(self):
+                pass
+
+        records = asyncio.run(runner.run_tests_async([BrokenFixture('test_nothing')], concurrency=2))
+        self.assertEqual(len(records), 1)
+        self.assertTrue(records[0]['id'].startswith('setUpClass ('))
+        self.assertIn('Неизвестный бэкенд', records[0]['message'])
+
+    def test_run_concurrent_runs_class_cleanups_after_fixture_error(self):
+        # Негативный тест: при ошибке setUpClass очистки класса выполняются, их ошибки попадают в отчёт
+        calls = []
+
+        class BrokenFixture(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                cls.addClassCleanup(calls.append, 'closed')
+                cls.addClassCleanup(int, 'broken cleanup')
+                raise RuntimeError('broken fixture')
+
+            def test_nothing(self):
+                pass
+
+        records = asyncio.run(runner.run_tests_async([BrokenFixture('test_nothing')], concurrency=2))
+        self.assertEqual(calls, ['closed'])
+        self.assertEqual([record['id'].split(' ')[0] for record in records], ['setUpClass', 'setUpClass'])
+        self.assertIn('broken fixture', records[0]['message'])
+        self.assertIn('broken cleanup', records[1]['message'])
+
+    def test_run_concurrent_reports_class_cleanup_error(self):
+        # Негативный тест: ошибка очистки после tearDownClass записывается под именем tearDownClass
+        class BrokenCleanup(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                cls.addClassCleanup(int, 'broken cleanup')
+
+            def test_nothing(self):
+                pass
+
+        records = asyncio.run(runner.run_tests_async([BrokenCleanup('test_nothing')], concurrency=2))
+        self.assertEqual([record['outcome'] for record in records], ['success', 'error'])
+        self.assertTrue(records[1]['id'].startswith('tearDownClass ('))
+        self.assertIn('broken cleanup', records[1]['message'])
+
+    def test_cache_key(self):
+        # Позитивный тест на ключ кэша: один метод в подклассе с другим бэкендом и другой метод дают разные ключи
+        key = runner.cache_key(TestCreateTableSQL('test_create_table_with_index'))
+        self.assertEqual(key, runner.cache_key(TestCreateTableSQL('test_create_table_with_index')))
+        self.assertNotEqual(key, runner.cache_key(TestCreateTableSQLFileWAL('test_create_table_with_index')))
+        self.assertNotEqual(key, runner.cache_key(TestCreateTableSQL('test_create_table_without_column')))
+
+    def test_cache_key_follows_called_helpers(self):
+        # Позитивный тест: ключ меняет правка вызываемой тестом функции локального модуля или используемой
+        # им константы, но не правка других функций этого модуля и других тестов тестового модуля
+        helper_source = 'def answer():\n    return 42\n'
+        tests_source = (
+            'import unittest\n'
+            'import cache_key_helper\n'
+            'EXPECTED = 42\n'
+            'class TestAnswer(unittest.TestCase):\n'
+            '    def test_answer(self):\n'
+            '        self.assertEqual(cache_key_helper.answer(), EXPECTED)\n'
+            '    def test_other(self):\n'
+            '        self.assertTrue(True)\n'
+        )
+        directory = self.write_test_modules({'cache_key_helper': helper_source, 'cache_key_tests': tests_source})
+
+        def keys(modules):
+            for name, source in modules.items():
+                with open(os.path.join(directory, f'{name}.py'), 'w', encoding='utf-8') as module_file:
+                    module_file.write(source)
+            sys.modules.pop('cache_key_helper', None)
+            sys.modules.pop('cache_key_tests', None)
+            tests = runner.collect_tests(['cache_key_tests'])
+            return [runner.cache_key(test) for test in tests]
+
+        answer_key, other_key = keys({})
+        self.assertEqual(keys({'cache_key_helper': helper_source + '\ndef unused():\n    return 0\n'}),
+                         [answer_key, other_key])
+        unchanged_answer_key, other_key = keys({'cache_key_tests': tests_source.replace('True', '1')})
+        self.assertEqual(unchanged_answer_key, answer_key)
+        changed_answer_key, unchanged_other_key = keys({'cache_key_helper': helper_source.replace('42', '40 + 2')})
+        self.assertNotEqual(changed_answer_key, answer_key)
+        self.assertEqual(unchanged_other_key, other_key)
+        self.assertNotEqual(keys({'cache_key_tests': tests_source.replace('= 42', '= 43')})[0], changed_answer_key)
+
+    def test_select_tests_skips_cached_passes(self):
+        # Позитивный тест на выборку: прошедший тест с тем же ключом пропускается, изменённый и упавший - нет
+        tests = [
+            TestCreateTableSQL('test_create_table_with_index'),
+            TestCreateTableSQL('test_create_table_without_column'),
+        ]
+        test_ids = [test.id() for test in tests]
+        selected, cached, keys = runner.select_tests(tests, {})
+        self.assertEqual((selected, cached), (test_ids, []))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.json')
+            records = [
+                {'id': test_ids[0], 'outcome': 'success'},
+                {'id': test_ids[1], 'outcome': 'failure'},
+            ]
+            runner.save_cache(path, {test_ids[1]: keys[test_ids[1]]}, records, keys)
+            cache = runner.load_json(path)
+        self.assertEqual(cache, {test_ids[0]: keys[test_ids[0]]})
+        selected, cached, _ = runner.select_tests(tests, cache)
+        self.assertEqual(selected, [test_ids[1]])
+        self.assertEqual([(record['id'], record['outcome']) for record in cached], [(test_ids[0], 'cached')])
+        # Ключ из другой версии кода или окружения не совпадает
+        selected, _, _ = runner.select_tests(tests, {test_ids[0]: 'stale'})
+        self.assertEqual(selected, test_ids)
+
+    def test_find_shadowed_tests(self):
+        # Негативный тест на повторное определение тестового метода, которое скрывает первое
+        source = (
+            'class TestA:\n'
+            '    def test_one(self):\n'
+            '        pass\n'
+            '\n'
+            '    def test_one(self):\n'
+            '        pass\n'
+            '\n'
+            '    def helper(self):\n'
+            '        pass\n'
+        )
+        records = runner.find_shadowed_tests(source, 'module')
+        self.assertEqual([record['id'] for record in records], ['module.TestA.test_one:2'])
+        self.assertIn('строке 5', records[0]['message'])
+
+    def test_tests_module_has_no_shadowed_tests(self):
+        # Позитивный тест на то, что в tests.py нет тестов, скрытых повторным определением
+        with open(__file__, encoding='utf-8') as source_file:
+            self.assertEqual(runner.find_shadowed_tests(source_file.read(), __name__), [])
+
+    def test_format_slowest(self):
+        # Позитивный тест на сортировку и ограничение отчёта о самых медленных тестах
+        records = [
+            {'id': 'tests.A.test_fast', 'duration': 0.1, 'statements': 2},
+            {'id': 'tests.A.test_slow', 'duration': 0.5, 'statements': None},
+            {'id': 'tests.A.test_medium', 'duration': 0.3, 'statements': 7},
+        ]
+        lines = runner.format_slowest(records, 2).splitlines()
+        self.assertEqual(lines[0], 'Slowest 2 tests:')
+        self.assertTrue(lines[2].endswith('-  tests.A.test_slow'))
+        self.assertTrue(lines[3].endswith('7  tests.A.test_medium'))
+        self.assertEqual(len(lines), 4)
+
+    def test_write_junit_xml(self):
+        # Позитивный тест на формирование отчёта JUnit XML из объединённых результатов
+        records = [
+            {'id': 'tests.A.test_ok', 'outcome': 'success', 'duration': 0.5, 'message': ''},
+            {'id': 'tests.A.test_fail', 'outcome': 'failure', 'duration': 0.1, 'message': 'AssertionError'},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'junit.xml')
+            runner.write_junit_xml(path, records, 0.6)
+            testsuite = ET.parse(path).getroot()
+
+        self.assertEqual(testsuite.get('tests'), '2')
+        self.assertEqual(testsuite.get('failures'), '1')
+        failure = testsuite.find("testcase[@name='test_fail']/failure")
+        self.assertIsNotNone(failure)
+        self.assertEqual(failure.text, 'AssertionError')
+
+
+class TestDDLFuzzer(unittest.TestCase):
+    def test_generation_is_deterministic(self):
+        # Позитивный тест на воспроизводимость генерации по seed
+        first = [fuzz.render(case) for case in fuzz.generate_cases(seed=42, count=200)]
+        second = [fuzz.render(case) for case in fuzz.generate_cases(seed=42, count=200)]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, [fuzz.render(case) for case in fuzz.generate_cases(seed=43, count=200)])
+
+    def test_predictions_match_sqlite(self):
+        # Позитивный тест на совпадение предсказанного и фактического исхода CREATE TABLE
+        report = fuzz.run_fuzz(seed=0, count=3000)
+        self.assertEqual(report['mismatches'], [])
+        self.assertGreater(report['predicted_valid'], 0)
+        self.assertGreater(report['predicted_invalid'], 0)
+
+    def test_predict_known_cases(self):
+        # Позитивный тест на предсказание для случаев из ручных тестов
+        table = fuzz.Identifier('employees', 'employees', True)
+        integer = fuzz.Fragment('INTEGER', True, 'type', ())
+        column = fuzz.Column(fuzz.Identifier('name', 'name', True), integer, ())
+        self.assertTrue(fuzz.predict(fuzz.Case(table, (column,), ())))
+        # Дублирующийся столбец, пустой список столбцов и числовое имя таблицы
+        duplicate = column._replace(name=fuzz.Identifier('NAME', 'NAME', True))
+        self.assertFalse(fuzz.predict(fuzz.Case(table, (column, duplicate), ())))
+        self.assertFalse(fuzz.predict(fuzz.Case(table, (), ())))
+        self.assertFalse(fuzz.predict(fuzz.Case(fuzz.Identifier('23', None, False), (column,), ())))
+
+    def test_shrink_to_minimal_reproducer(self):
+        # Позитивный тест на сокращение случая до минимального, сохраняющего признак
+        case = next(
+            case for case in fuzz.generate_cases(seed=1, count=1000)
+            if len(case.columns) > 2 and any(
+                constraint.kind == 'check' for column in case.columns for constraint in column.constraints
+            )
+        )
+        minimal = fuzz.shrink(case, lambda candidate: 'CHECK' in fuzz.render(candidate))
+        self.assertEqual(len(minimal.columns), 1)
+        self.assertEqual(len(minimal.table_constraints), 0)
+        self.assertEqual([constraint.kind for constraint in minimal.columns[0].constraints], ['check'])
+
+
+class TestBenchmarks(unittest.TestCase):
+    # Бенчмарки на минимальных размерах: проверка, что они выполняются и возвращают результаты
+    def test_catalog_benchmark(self):
+        results = benchmarks.bench_catalog(table_counts=(3,), column_counts=(2000,), lookups=5)
+        self.assertEqual([result['case'] for result in results], ['tables', 'columns'])
+        self.assertEqual(results[0]['table_count'], 3)
+        self.assertEqual(results[1]['column_count'], 2000)
+
+    def test_constraints_benchmark(self):
+        results = benchmarks.bench_constraints(row_counts=(100,), batch_size=30)
+        self.assertEqual(len(results), len(benchmarks.CONSTRAINT_CASES) * 2)
+        for result in results:
+            self.assertEqual(result['violation_raised'], result['enforced'])
+
+    def test_backends_benchmark(self):
+        results = benchmarks.bench_backends(repeat=1)
+        self.assertEqual([result['backend'] for result in results], list(BACKENDS))
+        for result in results:
+            self.assertGreater(result['commits'], 0)
+
+    def test_index_lookups_benchmark(self):
+        results = benchmarks.bench_index_lookups(row_counts=(500,), lookups=10, scan_lookups=2)
+        self.assertEqual([result['variant'] for result in results], ['none'] + list(INDEX_VARIANTS))
+        self.assertEqual(results[1]['equality']['lookups'], 10)
+
+    def test_foreign_keys_benchmark(self):
+        results = benchmarks.bench_foreign_keys(row_counts=(1000,), parent_operations=5)
+        self.assertEqual([result['child_indexes'] for result in results], [False, True])
+        self.assertEqual(results[0]['unindexed_foreign_keys'], 3)
+        self.assertEqual(results[1]['unindexed_foreign_keys'], 0)
+
+    def test_ctas_benchmark(self):
+        results = benchmarks.bench_ctas(row_counts=(1000,), batch_size=100)
+        self.assertEqual([result['method'] for result in results], list(benchmarks.CTAS_METHODS))
+        # CTAS теряет PRIMARY KEY, копии по DDL исходной таблицы его сохраняют
+        self.assertEqual([result['primary_key'] for result in results], [[], ['id'], ['id']])
+
+    def test_checksums_benchmark(self):
+        results = benchmarks.bench_checksums(row_counts=(1000,), batch_size=100)
+        self.assertEqual(results[0]['rows'], 1000)
+
+    def test_table_variants_benchmark(self):
+        results = benchmarks.bench_table_variants(row_counts=(1000,), lookups=10)
+        self.assertEqual([result['variant'] for result in results], list(TABLE_VARIANTS))
+        self.assertTrue(all(result['page_count'] > 0 for result in results))
+
+    def test_autoincrement_benchmark(self):
+        results = benchmarks.bench_autoincrement(row_counts=(1000,), committed_rows=10, batch_size=100)
+        self.assertEqual(len(results), 6)
+        self.assertEqual({result['sqlite_sequence'] for result in results if result['variant'] == 'autoincrement'},
+                         {1000, 10})
+
+    def test_check_constraints_benchmark(self):
+        results = benchmarks.bench_check_constraints(check_counts=(0, 8), row_count=100, step_rows=10, batch_size=50)
+        steps = {(result['complexity'], result['checks']): result['vm_steps_per_row'] for result in results}
+        # Каждое ограничение добавляет инструкции VM; без ограничений число шагов не зависит от сложности
+        for complexity in benchmarks.CHECK_COMPLEXITIES:
+            self.assertGreater(steps[complexity, 8], steps[complexity, 0])
+        self.assertEqual(len({steps[complexity, 0] for complexity in benchmarks.CHECK_COMPLEXITIES}), 1)
+
+    def test_check_function_rejects_row(self):
+        # Негативный тест на CHECK с пользовательской функцией, зарегистрированной через create_function
+        conn = benchmarks.connect_check_table(1, 'function')
+        with self.assertRaisesRegex(sqlite3.IntegrityError, 'CHECK constraint failed'):
+            conn.execute("INSERT INTO checked (id, value_0) VALUES (1, 1000000);")
+        conn.execute("INSERT INTO checked (id, value_0) VALUES (1, 999999);")
+        conn.close()
+
+    def test_unique_build_benchmark(self):
+        results = benchmarks.bench_unique_build(row_counts=(1000,), batch_size=100)
+        self.assertEqual([result['strategy'] for result in results], list(UNIQUE_BUILD_STRATEGIES))
+        self.assertEqual({result['rows'] for result in results}, {1000})
+
+    def test_clone_benchmark(self):
+        results = benchmarks.bench_clone(row_counts=(1000,), batch_size=100)
+        fidelity = {result['method']: (result['primary_key'], result['indexes']) for result in results}
+        # Копия clone.py и копия базы сохраняют ключ, UNIQUE и индекс по name, CTAS - ничего
+        self.assertEqual(fidelity, {'clone': (['id'], 2), 'ctas': ([], 0), 'backup': (['id'], 2)})
+
+    def test_ddl_contention_benchmark(self):
+        results = benchmarks.bench_ddl_contention(writer_counts=(3,), timeouts=(0,), table_count=5)
+        self.assertEqual([result['mode'] for result in results], list(benchmarks.DDL_MODES))
+        # Каждый писатель выполняет свои таблицы, а employees создаёт только один из них
+        self.assertEqual({result['ddl_statements'] for result in results}, {3 * 5 + 1})
+
+    def test_catalog_lookups_benchmark(self):
+        results = benchmarks.bench_catalog_lookups(table_counts=(5,), lookups=10, cache_sizes=(0, 16))
+        self.assertEqual([result['cached_statements'] for result in results], [0, 16])
+
+    def test_schema_inspector_benchmark(self):
+        results = benchmarks.bench_schema_inspector(table_counts=(5,), lookups=10)
+        self.assertEqual(results[0]['reloads'], 1)
+
+    def test_run_benchmarks_report(self):
+        report = benchmarks.run_benchmarks(['catalog'], quick=True)
+        self.assertEqual(report['sqlite_version'], sqlite3.sqlite_version)
+        self.assertIn('results', report['benchmarks']['catalog'])
+
+
 if __name__ == '__main__':
     unittest.main()